@@ -0,0 +1,39 @@
+"""Bytes transferred and wall time of results() with and without compression
+
+Fetches 1,000 row results pages from the local api simulator, which gzips
+responses when the client accepts it.
+
+Usage: python benchmarks/bench_compression.py [calls]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, '.')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import pingdomlib
+from simulator import PingdomSimulator
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    with PingdomSimulator(checks=1) as simulator:
+        checkid = next(iter(simulator.checks))
+        for compression in [False, True]:
+            with pingdomlib.Pingdom('user', 'pass', 'key',
+                                    server=simulator.url,
+                                    compression=compression) as api:
+                check = pingdomlib.check.PingdomCheck(api, {'id': checkid})
+                start = time.time()
+                for _ in range(calls):
+                    check.results()
+                elapsed = time.time() - start
+                print('compression=%-5s %6d calls %8.3fs %12d bytes received '
+                      '%12d bytes decoded' % (compression, calls, elapsed,
+                                              api.bytesreceived,
+                                              api.bytesdecoded))
+
+
+if __name__ == '__main__':
+    main()
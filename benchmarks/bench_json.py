@@ -0,0 +1,100 @@
+"""Decode time of getChecks() and results() payloads per JSON backend
+
+Decodes each fixture with every installed backend of pingdomlib.jsonbackend
+and with the streaming decoder of pingdomlib.jsonstream. Fixtures are
+generated unless captured response bodies are given as files.
+
+Usage: python benchmarks/bench_json.py [rounds] [fixture.json ...]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, '.')
+from pingdomlib.jsonbackend import loadBackend, preferred_backends
+from pingdomlib.jsonstream import iterItems
+
+
+def checksFixture(count=25000):
+    now = int(time.time())
+    checks = [{'id': 1000000 + i,
+               'name': 'check-%d' % i,
+               'type': 'http',
+               'hostname': 'host%d.example.com' % i,
+               'resolution': 5,
+               'status': 'up' if i % 10 else 'paused',
+               'created': now - i,
+               'lasterrortime': now - 3600,
+               'lasttesttime': now - 60,
+               'lastresponsetime': 200 + i % 500,
+               'tags': [{'name': 'team-%d' % (i % 7), 'type': 'u',
+                         'count': 1}]} for i in range(count)]
+    return json.dumps({'checks': checks}).encode('utf-8')
+
+
+def resultsFixture(rows=1000):
+    now = int(time.time())
+    results = []
+    for i in range(rows):
+        up = random.random() > 0.05
+        results.append({'probeid': random.randint(1, 60),
+                        'time': now - i * 60,
+                        'status': 'up' if up else 'down',
+                        'responsetime': random.randint(50, 2000),
+                        'statusdesc': 'OK' if up else 'Timeout',
+                        'statusdesclong': 'OK' if up else 'Timeout (> 30s)'})
+    return json.dumps({'results': results,
+                       'activeprobes': list(range(60))}).encode('utf-8')
+
+
+def timeit(function, rounds):
+    start = time.time()
+    for _ in range(rounds):
+        function()
+    return (time.time() - start) / rounds
+
+
+def arrayPath(body):
+    """Guesses the path of the main array of a captured body"""
+
+    data = json.loads(body.decode('utf-8'))
+    for key in ['checks', 'results']:
+        if key in data:
+            return (key,)
+    if 'actions' in data:
+        return ('actions', 'alerts')
+    return ()
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    if len(sys.argv) > 2:
+        fixtures = [(os.path.basename(path), open(path, 'rb').read())
+                    for path in sys.argv[2:]]
+    else:
+        fixtures = [('getChecks 25000 checks', checksFixture()),
+                    ('results 1000 rows', resultsFixture())]
+
+    backends = []
+    for name in preferred_backends:
+        try:
+            backends.append(loadBackend(name))
+        except ImportError:
+            print('%-10s not installed' % name)
+
+    for title, body in fixtures:
+        print('%s, %d bytes' % (title, len(body)))
+        for name, loads in backends:
+            seconds = timeit(lambda: loads(body), rounds)
+            print('  %-10s %8.2f ms' % (name, seconds * 1000))
+
+        path = arrayPath(body)
+        chunks = [body[i:i + 65536] for i in range(0, len(body), 65536)]
+        seconds = timeit(lambda: list(iterItems(chunks, path)), rounds)
+        print('  %-10s %8.2f ms' % ('stream', seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
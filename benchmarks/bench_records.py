@@ -0,0 +1,61 @@
+"""Memory and attribute access cost of PingdomCheck vs PingdomCheckRecord
+
+Builds 25,000 checks (the getChecks() limit) from listing payloads.
+
+Usage: python benchmarks/bench_records.py [checks]
+"""
+import pickle
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, '.')
+import pingdomlib
+from pingdomlib.check import PingdomCheck, PingdomCheckRecord
+
+
+def listing(count):
+    now = int(time.time())
+    return [{'id': 1000000 + i,
+             'name': 'check-%d' % i,
+             'type': 'http',
+             'hostname': 'host%d.example.com' % i,
+             'resolution': 5,
+             'status': 'up' if i % 10 else 'paused',
+             'created': now - i,
+             'lasterrortime': now - 3600,
+             'lasttesttime': now - 60,
+             'lastresponsetime': 200 + i % 500} for i in range(count)]
+
+
+def measure(name, build, payload):
+    tracemalloc.start()
+    objects = build(payload)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.time()
+    for _ in range(10):
+        for check in objects:
+            check.name, check.hostname, check.status, check.resolution
+    access = time.time() - start
+
+    pickled = len(pickle.dumps(objects, 2)) if name != 'PingdomCheck' else 0
+    print('%-20s %10.1f bytes/check %8.3fs for %d attribute reads %s' % (
+        name, size / float(len(objects)), access, 40 * len(objects),
+        '%d bytes pickled' % pickled if pickled else ''))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 25000
+    payload = listing(count)
+    api = pingdomlib.Pingdom('user', 'pass', 'key')
+
+    measure('PingdomCheck', lambda p: [PingdomCheck(api, x) for x in p],
+            payload)
+    measure('PingdomCheckRecord', lambda p: [PingdomCheckRecord(x)
+                                             for x in p], payload)
+
+
+if __name__ == '__main__':
+    main()
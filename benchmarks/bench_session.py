@@ -0,0 +1,46 @@
+"""Calls per second of Pingdom.request against the local api simulator
+
+Compares the pooled keep-alive session used by Pingdom.request with opening
+a new connection for every call, as the module-level requests functions do.
+
+Usage: python benchmarks/bench_session.py [calls]
+"""
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, '.')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import pingdomlib
+from simulator import PingdomSimulator
+
+
+def bench(name, calls, function):
+    start = time.time()
+    for _ in range(calls):
+        function()
+    elapsed = time.time() - start
+    print('%-24s %6d calls %8.3fs %10.1f calls/sec' % (name, calls, elapsed,
+                                                      calls / elapsed))
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    with PingdomSimulator(checks=0) as simulator:
+        api = pingdomlib.Pingdom('user', 'pass', 'key', server=simulator.url)
+        url = api.url + 'servertime'
+
+        def unpooled():
+            requests.get(url, auth=(api.username, api.password),
+                         headers={'App-Key': api.apikey})
+
+        with api:
+            bench('new connection per call', calls, unpooled)
+            bench('pooled session', calls, api.servertime)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Throughput and latency of the main client paths against the simulator
+
+Scenarios:
+
+    * getchecks -- getChecks() listing of every check
+    * results -- iterResults() over 30 days of one minute results, paging
+        with and without shards
+    * bulkmodify -- modifyChecks() pausing and unpausing every check
+    * hydrate -- hydrate() fetching check details with 1, 8 and 32 workers
+
+Each line reports wall time, requests sent, requests per second, items per
+second and the p50/p95 request latency seen by the client.
+
+Usage: python benchmarks/bench_suite.py [--checks N] [--latency SECONDS]
+           [--errorrate RATE] [scenario ...]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, '.')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import pingdomlib
+from pingdomlib.instrumentation import RequestHook
+from pingdomlib.retry import RetryPolicy
+from pingdomlib.sla import LatencyHistogram
+from simulator import PingdomSimulator
+
+
+class LatencyHook(RequestHook):
+    """Collects the time of every response in milliseconds"""
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.lock = threading.Lock()
+
+    def postResponse(self, event):
+        milliseconds = int((time.time() - event['start']) * 1000)
+        with self.lock:
+            self.histogram.add(milliseconds)
+
+
+def run(simulator, title, items, function, **kwargs):
+    """Runs function(api) on a fresh client and prints its figures, function
+        returns the number of items processed"""
+
+    hook = LatencyHook()
+    api = pingdomlib.Pingdom('user', 'pass', 'key', server=simulator.url,
+                             hooks=[hook], retrypolicy=RetryPolicy(
+                                 backoff=0.05, jitter=0.05), **kwargs)
+    with api:
+        start = time.time()
+        count = function(api)
+        elapsed = time.time() - start
+
+    requests = len(hook.histogram)
+    percentiles = hook.histogram.percentiles([50, 95])
+    print('%-30s %8.3fs %6d requests %8.1f req/s %10.1f %s/s '
+          'p50 %4sms p95 %4sms' % (title, elapsed, requests,
+                                   requests / elapsed, count / elapsed,
+                                   items, percentiles[50], percentiles[95]))
+
+
+def benchGetChecks(simulator, options):
+    for rounds in [1, 5]:
+        run(simulator, 'getChecks x%d' % rounds, 'checks',
+            lambda api: sum(len(api.getChecks()) for _ in range(rounds)))
+    run(simulator, 'getChecks lightweight x5', 'checks',
+        lambda api: sum(len(api.getChecks(lightweight=True))
+                        for _ in range(5)))
+
+
+def benchResults(simulator, options):
+    checkid = next(iter(simulator.checks))
+    time_to = int(time.time())
+    time_from = time_to - 30 * 86400
+
+    for shards in [1, 4, 8]:
+        def walk(api):
+            check = pingdomlib.check.PingdomCheck(api, {'id': checkid})
+            return sum(1 for _ in check.iterResults(time_from, time_to,
+                                                    shards=shards))
+        run(simulator, 'iterResults 30 days shards=%d' % shards, 'rows',
+            walk)
+
+
+def benchBulkModify(simulator, options):
+    def toggle(api):
+        ids = [check.id for check in api.getChecks(lightweight=True)]
+        api.modifyChecks(checkids=ids, paused=True)
+        api.modifyChecks(checkids=ids, paused=False)
+        return 2 * len(ids)
+    run(simulator, 'modifyChecks pause/unpause', 'checks', toggle)
+
+
+def benchHydrate(simulator, options):
+    count = min(options.checks, 500)
+    for workers in [1, 8, 32]:
+        def hydrate(api):
+            checks = api.getChecks()[:count]
+            return len(api.hydrate(checks, workers))
+        run(simulator, 'hydrate %d checks workers=%d' % (count, workers),
+            'checks', hydrate, pool_maxsize=workers)
+
+
+scenarios = {'getchecks': benchGetChecks,
+             'results': benchResults,
+             'bulkmodify': benchBulkModify,
+             'hydrate': benchHydrate}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--checks', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0.01,
+                        help='seconds added to every response')
+    parser.add_argument('--errorrate', type=float, default=0.0,
+                        help='share of requests failing with 5xx')
+    parser.add_argument('scenario', nargs='*', default=sorted(scenarios),
+                        help=', '.join(sorted(scenarios)))
+    options = parser.parse_args()
+    for name in options.scenario:
+        if name not in scenarios:
+            parser.error('unknown scenario %s' % name)
+
+    with PingdomSimulator(checks=options.checks, latency=options.latency,
+                          errorrate=options.errorrate) as simulator:
+        print('%d checks, %.0fms latency, %.1f%% errors' % (
+            options.checks, options.latency * 1000,
+            options.errorrate * 100))
+        for name in options.scenario:
+            scenarios[name](simulator, options)
+
+
+if __name__ == '__main__':
+    main()
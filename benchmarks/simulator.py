@@ -0,0 +1,612 @@
+"""Local simulator of the pingdom 2.0 api, for benchmarks and offline tests
+
+Serves generated checks, raw results, summaries, alerts, contacts and
+reports over HTTP on 127.0.0.1, with configurable latency, rate limit
+headers, gzip compression and error injection. Pass the simulator url as
+the server of a Pingdom instance:
+
+    with PingdomSimulator(checks=5000, latency=0.02) as simulator:
+        api = pingdomlib.Pingdom('user', 'pass', 'key',
+                                 server=simulator.url)
+
+Raw results are computed from the requested time range rather than stored,
+one test every resolution minutes per check, taken by rotating probes, so
+ranges of any length can be paged through.
+
+Usage: python benchmarks/simulator.py [port]
+"""
+import collections
+import json
+import random
+import sys
+import threading
+import time
+import zlib
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qsl, urlsplit
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qsl, urlsplit
+
+api_prefix = '/api/2.0/'
+
+# Check settings kept with the type specific settings, check.http etc.
+type_settings = set(['url', 'encryption', 'port', 'auth', 'shouldcontain',
+                     'shouldnotcontain', 'postdata', 'additionalurls',
+                     'stringtosend', 'stringtoexpect', 'expectedip',
+                     'nameserver', 'requestheaders'])
+
+# Check settings holding numbers and lists of identifiers
+integer_settings = set(['resolution', 'port', 'sendnotificationwhendown',
+                        'notifyagainevery'])
+list_settings = set(['contactids', 'integrationids'])
+
+probe_locations = [('Stockholm', 'Sweden', 'SE'), ('London', 'UK', 'GB'),
+                   ('Frankfurt', 'Germany', 'DE'), ('Dallas', 'US', 'US'),
+                   ('New York', 'US', 'US'), ('Los Angeles', 'US', 'US'),
+                   ('Tokyo', 'Japan', 'JP'), ('Sydney', 'Australia', 'AU')]
+
+
+class RateWindow(object):
+    """Request budget of one rate limit window"""
+
+    def __init__(self, limit, seconds):
+        self.limit = limit
+        self.seconds = seconds
+        self.start = time.time()
+        self.used = 0
+
+    def take(self):
+        """Takes a request from the window, returns the header value and
+            whether the request is within the limit"""
+
+        now = time.time()
+        if now - self.start >= self.seconds:
+            self.start = now
+            self.used = 0
+        self.used += 1
+        remaining = max(self.limit - self.used, 0)
+        reset = int(self.seconds - (now - self.start))
+        return ('Remaining: %d Time until reset: %d' % (remaining, reset),
+                self.used <= self.limit)
+
+
+class PingdomSimulator(object):
+    """Threaded HTTP server simulating the pingdom api
+
+    Parameters:
+
+        * checks -- Number of checks generated
+                Type: Integer
+                Default: 1000
+
+        * latency -- Seconds added to every response
+                Type: Float
+                Default: 0
+
+        * jitter -- Random seconds up to this added to the latency
+                Type: Float
+                Default: 0
+
+        * ratelimits -- (requests, seconds) of the short and long windows,
+            reported in Req-Limit-Short and Req-Limit-Long headers
+                Type: Tuple of two tuples
+                Default: ((12000, 3600), (48000, 86400))
+
+        * enforce -- Answer 429 once a rate limit window is used up
+                Type: Boolean
+                Default: False
+
+        * errorrate -- Share of requests answered with an error status
+                Type: Float
+                Default: 0
+
+        * errorstatuses -- Statuses injected errors are drawn from
+                Type: Tuple
+                Default: (500, 502, 503)
+
+        * compression -- Gzip responses when the client accepts it
+                Type: Boolean
+                Default: True
+
+        * resolution -- Minutes between the tests of a check
+                Type: Integer
+                Default: 1
+
+        * seed -- Seed of the generated data
+                Type: Integer
+                Default: 0
+
+    Attributes:
+
+        * url -- Server address to pass to Pingdom, once started
+        * stats -- Counter of requests per 'METHOD endpoint', plus
+            'errors' injected and 'ratelimited' refusals
+    """
+
+    def __init__(self, checks=1000, latency=0.0, jitter=0.0,
+                 ratelimits=((12000, 3600), (48000, 86400)), enforce=False,
+                 errorrate=0.0, errorstatuses=(500, 502, 503),
+                 compression=True, resolution=1, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.enforce = enforce
+        self.errorrate = errorrate
+        self.errorstatuses = errorstatuses
+        self.compression = compression
+        self.resolution = resolution
+        self.random = random.Random(seed)
+        self.windows = [RateWindow(limit, seconds)
+                        for limit, seconds in ratelimits]
+        self.stats = collections.Counter()
+        # Reentrant, routes creating checks take it again
+        self.lock = threading.RLock()
+        self.server = None
+        self.url = None
+
+        now = int(time.time())
+        self.probes = [{'id': i + 1, 'name': 'Probe %d' % (i + 1),
+                        'city': city, 'country': country,
+                        'countryiso': iso, 'active': True,
+                        'hostname': 'probe%d.pingdom.com' % (i + 1),
+                        'ip': '10.0.0.%d' % (i + 1)}
+                       for i, (city, country, iso) in
+                       enumerate(probe_locations)]
+        self.checks = collections.OrderedDict()
+        # Settings only returned with the details of a check, per id
+        self.settings = {}
+        self._nextid = 1000000
+        for i in range(checks):
+            self._addCheck({'name': 'check-%d' % i,
+                            'host': 'host%d.example.com' % i,
+                            'type': 'http',
+                            'resolution': resolution}, now - 86400 * 30)
+        self.contacts = collections.OrderedDict(
+            (i, {'id': i, 'name': 'contact-%d' % i,
+                 'email': 'ops%d@example.com' % i, 'paused': False})
+            for i in range(1, 51))
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self, port=0):
+        """Starts serving on a background thread, returns the url"""
+
+        class Handler(SimulatorHandler):
+            simulator = self
+
+        self.server = SimulatorServer(('127.0.0.1', port), Handler)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        return self.url
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def _addCheck(self, spec, created):
+        spec = dict(spec)
+        with self.lock:
+            checkid = self._nextid
+            self._nextid += 1
+            self.checks[checkid] = {
+                'id': checkid,
+                'name': spec.pop('name', 'check-%d' % checkid),
+                'type': spec.pop('type', 'http'),
+                'hostname': 'example.com',
+                'resolution': self.resolution,
+                'status': 'up',
+                'created': created,
+                'lasterrortime': created,
+                'lasttesttime': int(time.time()) - 60,
+                'lastresponsetime': 200 + checkid % 500}
+            self._modifyCheck(checkid, spec)
+        return self.checks[checkid]
+
+    def _modifyCheck(self, checkid, parameters):
+        """Applies request parameters to a check the way pingdom stores
+            them, raises ValueError for invalid values"""
+
+        check = self.checks[checkid]
+        settings = self.settings.setdefault(checkid, {})
+        for key, value in parameters.items():
+            value = self._parameter(key, value)
+            if key in ['name', 'type']:
+                check[key] = value
+            elif key == 'host':
+                check['hostname'] = value
+            elif key == 'resolution':
+                check['resolution'] = value
+            elif key == 'paused':
+                check['status'] = 'paused' if value else 'up'
+            elif key in type_settings:
+                settings.setdefault('typesettings', {})[key] = value
+            else:
+                settings[key] = value
+
+    @staticmethod
+    def _parameter(key, value):
+        """Converts a request parameter to the type pingdom returns"""
+
+        if value in ['true', 'false']:
+            return value == 'true'
+        if key in integer_settings:
+            return int(value)
+        if key in list_settings:
+            return [int(i) for i in value.split(',') if i]
+        return value
+
+    # Generated data
+
+    def _result(self, checkid, step, when):
+        seed = (checkid * 2654435761 + when) & 0xffffffff
+        down = seed % 97 == 0
+        return {'probeid': (when // step + checkid) % len(self.probes) + 1,
+                'time': when,
+                'status': 'down' if down else 'up',
+                'responsetime': 0 if down else 80 + seed % 900,
+                'statusdesc': 'Timeout' if down else 'OK',
+                'statusdesclong': 'Timeout (> 30s)' if down else 'OK'}
+
+    def results(self, checkid, query):
+        check = self.checks[checkid]
+        step = check['resolution'] * 60
+        time_to = int(query.get('to', time.time()))
+        time_from = int(query.get('from', time_to - 86400))
+        limit = min(int(query.get('limit', 1000)), 1000)
+        offset = int(query.get('offset', 0))
+        if offset > 43200:
+            return 400, {'error': {'statuscode': 400,
+                                   'errormessage': 'offset too large'}}
+
+        newest = time_to - time_to % step
+        rows = []
+        if query.get('status') or query.get('probes'):
+            statuses = query.get('status', '').split(',')
+            probes = query.get('probes', '').split(',')
+            when = newest
+            skipped = 0
+            while when >= time_from and len(rows) < limit:
+                result = self._result(checkid, step, when)
+                when -= step
+                if query.get('status') and result['status'] not in statuses:
+                    continue
+                if (query.get('probes') and
+                        str(result['probeid']) not in probes):
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                rows.append(result)
+        else:
+            for index in range(offset, offset + limit):
+                when = newest - index * step
+                if when < time_from:
+                    break
+                rows.append(self._result(checkid, step, when))
+        return 200, {'results': rows,
+                     'activeprobes': [p['id'] for p in self.probes]}
+
+    def outages(self, checkid, query):
+        time_to = int(query.get('to', time.time()))
+        time_from = int(query.get('from', time_to - 7 * 86400))
+        states = []
+        start = time_from
+        while start < time_to:
+            end = min(start + 6 * 3600, time_to)
+            status = 'down' if (start // 3600 + checkid) % 17 == 0 else 'up'
+            if states and states[-1]['status'] == status:
+                states[-1]['timeto'] = end
+            else:
+                states.append({'status': status, 'timefrom': start,
+                               'timeto': end})
+            start = end
+        return 200, {'summary': {'states': states}}
+
+    def performance(self, checkid, query):
+        resolution = query.get('resolution', 'hour')
+        size = {'hour': 3600, 'day': 86400, 'week': 604800}[resolution]
+        time_to = int(query.get('to', time.time()))
+        time_from = int(query.get('from', time_to - 10 * size))
+        intervals = []
+        for start in range(time_from - time_from % size, time_to, size):
+            intervals.append({'starttime': start,
+                              'avgresponse': 100 + (start // size) % 400,
+                              'uptime': size, 'downtime': 0,
+                              'unmonitored': 0})
+        return 200, {'summary': {resolution + 's': intervals}}
+
+    def averages(self, checkid, query):
+        time_to = int(query.get('to', time.time()))
+        time_from = int(query.get('from', 0))
+        return 200, {'summary': {
+            'responsetime': {'from': time_from, 'to': time_to,
+                             'avgresponse': 200 + checkid % 300},
+            'status': {'totalup': 86000, 'totaldown': 400,
+                       'totalunknown': 0}}}
+
+    def alerts(self, query):
+        limit = min(int(query.get('limit', 100)), 300)
+        offset = int(query.get('offset', 0))
+        now = int(time.time())
+        ids = list(self.checks)
+        alerts = []
+        for index in range(offset, min(offset + limit, 10000)):
+            checkid = ids[index % len(ids)] if ids else 0
+            alerts.append({'contactname': 'contact-1', 'contactid': 1,
+                           'checkid': checkid, 'time': now - index * 300,
+                           'via': 'email',
+                           'status': 'sent', 'messageshort': 'down',
+                           'messagefull': 'check %d is down' % checkid,
+                           'sentto': 'ops1@example.com', 'charged': False})
+        return 200, {'actions': {'alerts': alerts}}
+
+    # Request handling
+
+    def handle(self, method, path, query):
+        """Returns (status, body, headers) for a request to path, relative
+            to the api root"""
+
+        parts = path.strip('/').split('/')
+        endpoint = parts[0]
+        itemid = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() \
+            else None
+
+        headers = {}
+        limited = False
+        with self.lock:
+            self.stats['%s %s' % (method, endpoint)] += 1
+            for name, window in zip(['Req-Limit-Short', 'Req-Limit-Long'],
+                                    self.windows):
+                headers[name], allowed = window.take()
+                limited = limited or not allowed
+            error = (self.errorrate and
+                     self.random.random() < self.errorrate)
+            if error:
+                self.stats['errors'] += 1
+                status = self.random.choice(self.errorstatuses)
+            if limited and self.enforce:
+                self.stats['ratelimited'] += 1
+
+        if limited and self.enforce:
+            headers['Retry-After'] = '1'
+            return 429, {'error': {'statuscode': 429,
+                                   'errormessage': 'Rate limit exceeded'}}, \
+                headers
+        if error:
+            return status, {'error': {'statuscode': status,
+                                      'errormessage': 'Injected error'}}, \
+                headers
+
+        with self.lock:
+            try:
+                status, body = self.route(method, endpoint, itemid, query)
+            except (KeyError, TypeError, ValueError) as invalid:
+                status, body = 400, {'error': {
+                    'statuscode': 400,
+                    'errormessage': 'Invalid parameter: %s' % invalid}}
+        return status, body, headers
+
+    def route(self, method, endpoint, itemid, query):
+        missing = 404, {'error': {'statuscode': 404,
+                                  'errormessage': 'Not found'}}
+
+        if endpoint == 'checks':
+            return self.routeChecks(method, itemid, query)
+        if endpoint == 'results' and itemid in self.checks:
+            return self.results(itemid, query)
+        if endpoint == 'summary.outage' and itemid in self.checks:
+            return self.outages(itemid, query)
+        if endpoint == 'summary.performance' and itemid in self.checks:
+            return self.performance(itemid, query)
+        if endpoint == 'summary.average' and itemid in self.checks:
+            return self.averages(itemid, query)
+        if endpoint == 'summary.hoursofday' and itemid in self.checks:
+            return 200, {'hoursofday': [{'hour': h, 'avgresponse': 200 + h}
+                                        for h in range(24)]}
+        if endpoint == 'summary.probes' and itemid in self.checks:
+            return 200, {'probes': [p['id'] for p in self.probes]}
+        if endpoint == 'actions':
+            return self.alerts(query)
+        if endpoint == 'probes':
+            return 200, {'probes': self.probes}
+        if endpoint == 'servertime':
+            return 200, {'servertime': int(time.time())}
+        if endpoint == 'credits':
+            return 200, {'credits': {'checklimit': 100000,
+                                     'availablechecks': 100000 -
+                                     len(self.checks),
+                                     'useddefault': len(self.checks),
+                                     'autofillsms': False}}
+        if endpoint == 'notification_contacts':
+            return self.routeContacts(method, itemid, query)
+        if endpoint == 'reports.email' and method == 'GET':
+            return 200, {'subscriptions': [
+                {'id': 1, 'name': 'weekly', 'checkid': checkid,
+                 'frequency': 'weekly', 'contactids': [1],
+                 'additionalemails': []} for checkid in
+                list(self.checks)[:10]]}
+        if endpoint == 'reports.shared' and method == 'GET':
+            return 200, {'shared': {'banners': [
+                {'id': 'abc%d' % checkid, 'name': 'banner', 'checkid': checkid,
+                 'auto': True, 'type': 'uptime',
+                 'url': 'https://share.pingdom.com/banners/abc'}
+                for checkid in list(self.checks)[:10]]}}
+        return missing
+
+    def routeChecks(self, method, itemid, query):
+        if itemid is None:
+            if method == 'GET':
+                checks = list(self.checks.values())
+                if query.get('tags'):
+                    tags = set(query['tags'].split(','))
+                    checks = [check for check in checks if tags & set(
+                        self.settings[check['id']].get('tags', '').split(
+                            ','))]
+                offset = int(query.get('offset', 0))
+                limit = int(query.get('limit', 25000))
+                return 200, {'checks': checks[offset:offset + limit]}
+            if method == 'POST':
+                check = self._addCheck(query, int(time.time()))
+                return 200, {'check': {'id': check['id'],
+                                       'name': check['name']}}
+            if method == 'PUT':
+                ids = [int(i) for i in query.get('checkids', '').split(',')
+                       if i] or list(self.checks)
+                for checkid in ids:
+                    check = self.checks.get(checkid)
+                    if check is None:
+                        continue
+                    self._modifyCheck(checkid, dict(
+                        (key, query[key]) for key in ['paused', 'resolution']
+                        if key in query))
+                return 200, {'message': 'Modification of %d checks was '
+                                        'successful!' % len(ids)}
+            if method == 'DELETE':
+                ids = [int(i) for i in
+                       query.get('delcheckids', '').split(',') if i]
+                for checkid in ids:
+                    self.checks.pop(checkid, None)
+                    self.settings.pop(checkid, None)
+                return 200, {'message': 'Deletion of checks was successful!'}
+
+        check = self.checks.get(itemid)
+        if check is None:
+            return 404, {'error': {'statuscode': 404,
+                                   'errormessage': 'Check not found'}}
+        if method == 'GET':
+            settings = dict(self.settings.get(itemid, {}))
+            typesettings = {'url': '/', 'encryption': False, 'port': 80,
+                            'requestheaders': {
+                                'User-Agent': 'Pingdom.com_bot'}}
+            typesettings.update(settings.pop('typesettings', {}))
+            details = dict(check)
+            details.update({'sendtoemail': True, 'sendtosms': False,
+                            'sendtotwitter': False, 'sendtoiphone': False,
+                            'sendtoandroid': False,
+                            'sendnotificationwhendown': 2,
+                            'notifyagainevery': 0, 'notifywhenbackup': True,
+                            'contactids': [1]})
+            details.update(settings)
+            details['type'] = {check['type']: typesettings}
+            return 200, {'check': details}
+        if method == 'PUT':
+            self._modifyCheck(itemid, query)
+            return 200, {'message': 'Modification of check was successful!'}
+        if method == 'DELETE':
+            self.checks.pop(itemid, None)
+            self.settings.pop(itemid, None)
+            return 200, {'message': 'Deletion of check was successful!'}
+
+    def routeContacts(self, method, itemid, query):
+        if method == 'GET':
+            return 200, {'contacts': list(self.contacts.values())}
+        if method == 'POST':
+            contactid = max(self.contacts or [0]) + 1
+            self.contacts[contactid] = dict(
+                ((key, self._parameter(key, value))
+                 for key, value in query.items()), id=contactid)
+            return 200, {'contact': {'id': contactid,
+                                     'name': query.get('name')}}
+        ids = [itemid] if itemid is not None else [
+            int(i) for i in (query.get('contactids') or
+                             query.get('delcheckids') or '').split(',')
+            if i]
+        for contactid in ids:
+            if method == 'DELETE':
+                self.contacts.pop(contactid, None)
+            elif contactid in self.contacts:
+                self.contacts[contactid].update(
+                    (key, self._parameter(key, value))
+                    for key, value in query.items()
+                    if key not in ['contactids', 'delcheckids'])
+        return 200, {'message': 'Modification of contacts was successful!'}
+
+
+class SimulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    simulator = None
+
+    def _serve(self, method):
+        simulator = self.simulator
+        url = urlsplit(self.path)
+        query = dict(parse_qsl(url.query))
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            body = self.rfile.read(length).decode('utf-8')
+            query.update(dict(parse_qsl(body)))
+
+        delay = simulator.latency
+        if simulator.jitter:
+            delay += random.random() * simulator.jitter
+        if delay:
+            time.sleep(delay)
+
+        if url.path.startswith(api_prefix):
+            status, body, headers = simulator.handle(
+                method, url.path[len(api_prefix):], query)
+        else:
+            status, body, headers = 404, {'error': 'Not found'}, {}
+
+        payload = json.dumps(body, separators=(',', ':')).encode('utf-8')
+        encodings = self.headers.get('Accept-Encoding', '')
+        if simulator.compression and 'gzip' in encodings:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            payload = compressor.compress(payload) + compressor.flush()
+            headers['Content-Encoding'] = 'gzip'
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self._serve('GET')
+
+    def do_POST(self):
+        self._serve('POST')
+
+    def do_PUT(self):
+        self._serve('PUT')
+
+    def do_DELETE(self):
+        self._serve('DELETE')
+
+    def log_message(self, *args):
+        pass
+
+
+class SimulatorServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8080
+    simulator = PingdomSimulator()
+    print('Simulating the pingdom api on %s' % simulator.start(port))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        simulator.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,14 @@ Connecting to pingdom
 import pingdomlib
 api = pingdomlib.Pingdom(username, password, apikey)
 
+Connections are pooled and kept alive between calls, release them with
+api.close() or use the connection object as a context manager
+with pingdomlib.Pingdom(username, password, apikey) as api:
+    print api.servertime()
+
+Responses are decoded with orjson, simdjson or ujson when one is installed,
+pass jsonbackend='json' to Pingdom() to use the standard library instead
+
 Show all checks that are not in 'UP' status
 -------------------------------------------
 # See pingdomlib.pingdom documentation to see available calls and settings
@@ -33,9 +41,102 @@ Updating a check
 # Updates to check objects are pushed immediately to pingdom
 newcheck.paused = True
 
+# Several changes can be pushed in a single request
+with newcheck.batch():
+    newcheck.paused = False
+    newcheck.resolution = 5
+
+Walk a month of raw results for a check
+---------------------------------------
+import time
+check = api.getCheck(227878)
+for result in check.iterResults(time.time() - 30 * 86400):
+    if result['status'] == 'down':
+        print result['time'], result['statusdesclong']
+
+Export raw results as typed columns
+-----------------------------------
+columns = check.resultColumns(time.time() - 30 * 86400)
+arrays = columns.toNumpy()  # Requires numpy, toArrow() requires pyarrow
+columns.writeCSV(open('results.csv', 'w'))
+
+Polling new raw results only
+----------------------------
+from pingdomlib.store import ResultStore
+with ResultStore('results.db') as store:
+    # Each run asks pingdom for the results added since the previous one
+    for result in check.syncResults(store, overlap=300):
+        print result['time'], result['status']
+
+Reports from a local copy of check history
+------------------------------------------
+# Ranges already in the store are answered locally, only gaps are fetched
+with ResultStore('history.db') as store:
+    month_start = time.time() - 30 * 86400
+    results = check.storedResults(store, month_start, status='down')
+    outages = check.storedOutages(store, month_start)
+    daily = check.storedPerformance(store, month_start, resolution='day')
+
+Computing latency percentiles and uptime locally
+------------------------------------------------
+from pingdomlib.sla import SLACalculator, probeCountries
+sla = SLACalculator(bucket=86400, countries=probeCountries(api),
+                    target=0.999)
+sla.extend(check.iterResults(time.time() - 30 * 86400))
+report = sla.report(percentiles=(50, 95, 99))
+print report['overall']['uptime'], report['countries']
+
+Collecting summaries for every check
+------------------------------------
+# Calls run in parallel under the rate limits, failures are yielded too
+for check, name, summary in api.collectSummaries(time_from=start,
+                                                 time_to=end, workers=16):
+    if isinstance(summary, Exception):
+        print "%s %s failed: %s" % (check.name, name, summary)
+
+Fetching outages for many checks concurrently with asyncio
+------------------------------------------------------------
+import asyncio
+from pingdomlib.asyncpingdom import AsyncPingdom
+
+async def allOutages():
+    async with AsyncPingdom(username, password, apikey, concurrency=100) as api:
+        checks = await api.getChecks()
+        return await asyncio.gather(*[check.outages() for check in checks])
+
+Caching rarely changing data
+----------------------------
+from pingdomlib.cache import ResponseCache
+api = pingdomlib.Pingdom(username, password, apikey, cache=ResponseCache())
+api.probes()  # Later calls within an hour are served from the cache
+print api.cache.stats
+
+Checking the remaining api rate limit budget
+--------------------------------------------
+# Requests wait for the limits to reset instead of being refused, pass
+# pace=True to Pingdom() to spread them evenly over the limit windows
+budget = api.budget()
+if budget['short'] is not None:
+    print "%d calls left for %ds" % (budget['short']['remaining'],
+                                     budget['short']['reset'])
+
+Finding slow endpoints
+----------------------
+from pingdomlib.instrumentation import EndpointStats, PrometheusHook
+stats = EndpointStats()
+api = pingdomlib.Pingdom(username, password, apikey,
+                         hooks=[stats, PrometheusHook()])
+api.getChecks(details=True)
+for method, endpoint in stats.slowest(3):
+    print method, endpoint, stats.stats[(method, endpoint)]['phases']
+
 Disabling change pushing for checks
 -----------------------------------
 api.pushChanges = False
+for check in api.getChecks(tags='maintenance'):
+    check.paused = True
+# Pushes all pending changes, grouping them into bulk calls where possible
+api.flush()
 
 Get last 10 pingdom alerts sent
 -------------------------------
@@ -46,6 +147,13 @@ for alert in api.alerts(limit=10):
 
     print "[%s] %s is %s" % (time, alert['name'], alert['status'])
 
+Walk every alert sent this quarter
+----------------------------------
+import time
+quarter_start = int(time.time()) - 91 * 86400
+for alert in api.iterAlerts(**{'from': quarter_start}):
+    print "[%s] %s is %s" % (alert['time'], alert['name'], alert['status'])
+
 Get outages for a specific check
 --------------------------------
 import datetime
@@ -79,12 +187,5 @@ Contributors
 Special thanks
 ==============
 Anders Ekman, Pingdom, for offering warm and helpful support with the API
-
-TODO list
-=========
-Planned improvements
---------------------
-* Optional Gzip Compression
-* Improve check update process with pushChanges disabled
 """
 from pingdomlib.pingdom import Pingdom
@@ -0,0 +1,155 @@
+import asyncio
+import functools
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pingdomlib.check import PingdomCheck, summaryParameters
+from pingdomlib.pingdom import Pingdom
+
+
+class AsyncPingdom(Pingdom):
+    """asyncio variant of the Pingdom connection object
+
+    Requests are run on worker threads sharing the pooled session, at most
+    'concurrency' of them at once. Parameters are checked exactly as in the
+    Pingdom class.
+
+    The read calls getChecks(), getCheck(), actions() and alerts() are
+        coroutines, and checks they return are AsyncPingdomCheck instances
+        whose summary calls are coroutines as well. Every other call
+        inherited from Pingdom still blocks.
+
+    Additional parameters:
+
+        * concurrency -- Maximum number of requests in flight
+                Type: Integer
+                Default: 100
+
+    Example:
+
+        async with AsyncPingdom(username, password, apikey) as api:
+            checks = await api.getChecks()
+            outages = await asyncio.gather(*[c.outages() for c in checks])
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.concurrency = kwargs.pop('concurrency', 100)
+        # Keep a pooled connection around for every request in flight
+        kwargs.setdefault('pool_maxsize', self.concurrency)
+        Pingdom.__init__(self, *args, **kwargs)
+        self._executor = ThreadPoolExecutor(self.concurrency)
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Closes all pooled connections and stops the worker threads"""
+
+        self._executor.shutdown(wait=False)
+        Pingdom.close(self)
+
+    async def arequest(self, method, url, parameters=dict()):
+        """Coroutine wrapping request(), limited to 'concurrency' requests
+            in flight"""
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        loop = asyncio.get_event_loop()
+        async with self._semaphore:
+            return await loop.run_in_executor(
+                self._executor,
+                functools.partial(self.request, method, url, parameters))
+
+    async def actions(self, **parameters):
+        """Coroutine version of Pingdom.actions()"""
+
+        self._actionsParameters(parameters)
+        response = await self.arequest('GET', 'actions', parameters)
+        return response.json()['actions']
+
+    async def alerts(self, **parameters):
+        """Coroutine version of Pingdom.alerts()"""
+
+        return (await self.actions(**parameters))['alerts']
+
+    async def getChecks(self, **parameters):
+        """Coroutine version of Pingdom.getChecks(), returns a list of
+            AsyncPingdomCheck instances"""
+
+        self._getChecksParameters(parameters)
+        response = await self.arequest('GET', 'checks', parameters)
+        return [AsyncPingdomCheck(self, x) for x in response.json()['checks']]
+
+    async def getCheck(self, checkid):
+        """Coroutine version of Pingdom.getCheck()"""
+
+        check = AsyncPingdomCheck(self, {'id': checkid})
+        await check.getDetails()
+        return check
+
+
+class AsyncPingdomCheck(PingdomCheck):
+    """PingdomCheck bound to an AsyncPingdom connection
+
+    getDetails() and the summary calls averages(), hoursofday(), outages(),
+        performance(), probes() and results() are coroutines, see
+        PingdomCheck for their parameters and returned structures.
+        Attribute changes are still pushed with a blocking modify().
+    """
+
+    def __getattr__(self, attr):
+        # Details can't be loaded lazily without blocking the event loop
+        raise AttributeError("'AsyncPingdomCheck' object has no attribute "
+                             "'%s', await getDetails() first" % attr)
+
+    async def getDetails(self):
+        """Update check details, returns dictionary of details"""
+
+        response = await self.pingdom.arequest('GET', 'checks/%s' % self.id)
+        details = response.json()['check']
+        self.__addDetails__(details)
+        return details
+
+    async def averages(self, **kwargs):
+        kwargs = summaryParameters('averages', kwargs)
+        response = await self.pingdom.arequest(
+            'GET', 'summary.average/%s' % self.id, kwargs)
+        return response.json()['summary']
+
+    async def hoursofday(self, **kwargs):
+        kwargs = summaryParameters('hoursofday', kwargs)
+        response = await self.pingdom.arequest(
+            'GET', 'summary.hoursofday/%s' % self.id, kwargs)
+        return response.json()['hoursofday']
+
+    async def outages(self, **kwargs):
+        kwargs = summaryParameters('outages', kwargs)
+        response = await self.pingdom.arequest(
+            'GET', 'summary.outage/%s' % self.id, kwargs)
+        return response.json()['summary']['states']
+
+    async def performance(self, **kwargs):
+        kwargs = summaryParameters('performance', kwargs)
+        response = await self.pingdom.arequest(
+            'GET', 'summary.performance/%s' % self.id, kwargs)
+        return response.json()['summary']
+
+    async def probes(self, fromtime, totime=None):
+        args = {'from': fromtime}
+        if totime:
+            args['to'] = totime
+
+        response = await self.pingdom.arequest(
+            'GET', 'summary.probes/%s' % self.id, args)
+        return response.json()['probes']
+
+    async def results(self, **kwargs):
+        kwargs = summaryParameters('results', kwargs)
+        response = await self.pingdom.arequest(
+            'GET', 'results/%s' % self.id, kwargs)
+        return response.json()
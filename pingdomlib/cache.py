@@ -0,0 +1,125 @@
+import collections
+import threading
+import time
+
+# Seconds GET responses are kept per endpoint. Keys are either an endpoint,
+# or an endpoint followed by '/*' to match calls for a single item
+default_ttls = {
+    'probes': 3600,
+    'reference': 86400,
+    'settings': 300,
+    'notification_contacts': 300,
+    'checks/*': 60,
+}
+
+
+class ResponseCache(object):
+    """Least recently used cache of GET responses from pingdom
+
+    Only endpoints with a time to live are cached. A successful POST, PUT or
+    DELETE invalidates every cached response of the same endpoint, so writes
+    are never hidden by stale reads.
+
+    Any object with the get(), set() and invalidate() methods of this class
+    can be passed to Pingdom as cache.
+
+    Parameters:
+
+        * maxsize -- Maximum number of responses kept
+                Type: Integer
+                Default: 1024
+
+        * ttls -- Time to live in seconds per endpoint, replaces default_ttls
+                Type: Dictionary
+                Default: default_ttls
+
+    Attributes:
+
+        * stats -- Dictionary of counters
+            {
+                'hits'          : <Integer> Responses served from the cache
+                'misses'        : <Integer> Cacheable calls sent to pingdom
+                'evictions'     : <Integer> Responses dropped to make room
+                'invalidations' : <Integer> Responses dropped after a write
+            }
+    """
+
+    def __init__(self, maxsize=1024, ttls=None):
+        self.maxsize = maxsize
+        self.ttls = default_ttls if ttls is None else ttls
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0,
+                      'invalidations': 0}
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def endpoint(url):
+        """Returns the endpoint of a request url, 'checks' for 'checks/123'"""
+
+        return url.split('/', 1)[0]
+
+    def ttl(self, url):
+        """Returns the time to live for responses of url, None if they are
+            not cached"""
+
+        if url in self.ttls:
+            return self.ttls[url]
+        endpoint = self.endpoint(url)
+        if endpoint != url and endpoint + '/*' in self.ttls:
+            return self.ttls[endpoint + '/*']
+        if endpoint == url:
+            return self.ttls.get(endpoint)
+        return None
+
+    @staticmethod
+    def _key(url, parameters):
+        return url, tuple(sorted((str(k), str(v))
+                                 for k, v in parameters.items()))
+
+    def get(self, url, parameters):
+        """Returns the cached response for a GET call, None on a miss"""
+
+        if self.ttl(url) is None:
+            return None
+
+        key = self._key(url, parameters)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry[0] < time.time():
+                self.stats['misses'] += 1
+                return None
+            # Re-insert as most recently used
+            self._entries[key] = entry
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def set(self, url, parameters, response):
+        """Stores the response of a successful GET call"""
+
+        ttl = self.ttl(url)
+        if ttl is None:
+            return
+
+        key = self._key(url, parameters)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + ttl, response)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def invalidate(self, url):
+        """Drops cached responses of the endpoint url belongs to"""
+
+        endpoint = self.endpoint(url)
+        with self._lock:
+            for key in list(self._entries):
+                if self.endpoint(key[0]) == endpoint:
+                    del self._entries[key]
+                    self.stats['invalidations'] += 1
+
+    def clear(self):
+        """Drops all cached responses"""
+
+        with self._lock:
+            self._entries.clear()
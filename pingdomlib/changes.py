@@ -0,0 +1,110 @@
+import contextlib
+
+# Marks attributes that did not exist before a batch
+_missing = object()
+
+
+class ChangeTracking(object):
+    """Mixin for pingdom objects whose attribute changes are pushed with
+        modify()
+
+    Classes call _pushChange() from __setattr__ for attributes pingdom can
+    modify, and provide a modify(**changes) method.
+
+    With pushChanges disabled changed attributes are tracked as dirty until
+    flush() is called on the object, or Pingdom.flush() for all objects.
+    """
+
+    def _pushChange(self, key, value):
+        """Sends or collects the change of an attribute"""
+
+        batch = self.__dict__.get('_batch')
+        if batch is not None:
+            # Called before the attribute is set, remember its value to
+            # restore it when the batch is discarded
+            if key not in batch:
+                self._batchOld[key] = self.__dict__.get(key, _missing)
+            batch[key] = value
+        elif self.pingdom.pushChanges:
+            self.modify(**{key: value})
+        else:
+            self.__dict__.setdefault('_dirty', {})[key] = value
+            self.pingdom._queueChanges(self)
+
+    def pendingChanges(self):
+        """Returns a dictionary of changes not pushed to pingdom yet"""
+
+        return dict(self.__dict__.get('_dirty') or {})
+
+    def flush(self):
+        """Pushes pending changes in a single modify() call. Returns the
+            status message, None if there was nothing to push"""
+
+        changes = self.pendingChanges()
+        if not changes:
+            return None
+        message = self.modify(**changes)
+        self._clearChanges(changes)
+        return message
+
+    def _clearChanges(self, changes):
+        """Forgets pushed changes, keeping those made in the meantime"""
+
+        dirty = self.__dict__.get('_dirty') or {}
+        for key, value in changes.items():
+            if key in dirty and dirty[key] is value:
+                del dirty[key]
+        if not dirty:
+            self.pingdom._dequeueChanges(self)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Context manager collecting attribute changes, which are pushed
+            to pingdom in a single modify() call on exit
+
+        Example:
+
+            with check.batch():
+                check.paused = True
+                check.resolution = 5
+
+        When the block raises an exception the changes are discarded and
+            the attributes set back to their previous values. Changes whose
+            push fails are kept as pending changes, see flush(). With
+            pushChanges disabled the changes are only collected as pending.
+            Nested batches are merged into the outermost one.
+        """
+
+        if self.__dict__.get('_batch') is not None:
+            yield self
+            return
+
+        object.__setattr__(self, '_batch', {})
+        object.__setattr__(self, '_batchOld', {})
+        try:
+            yield self
+        except BaseException:
+            for key, value in self._batchOld.items():
+                if value is _missing:
+                    self.__dict__.pop(key, None)
+                else:
+                    object.__setattr__(self, key, value)
+            raise
+        finally:
+            changes = self._batch
+            object.__setattr__(self, '_batch', None)
+            object.__setattr__(self, '_batchOld', None)
+
+        if not changes:
+            return
+        if not self.pingdom.pushChanges:
+            self.__dict__.setdefault('_dirty', {}).update(changes)
+            self.pingdom._queueChanges(self)
+            return
+        try:
+            self.modify(**changes)
+        except Exception:
+            # Keep them for flush(), the attributes are already set
+            self.__dict__.setdefault('_dirty', {}).update(changes)
+            self.pingdom._queueChanges(self)
+            raise
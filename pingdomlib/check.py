@@ -1,5 +1,10 @@
 import sys
+import time
+
 from pingdomlib.analysis import PingdomAnalysis
+from pingdomlib.changes import ChangeTracking
+from pingdomlib.columnar import ResultColumns
+from pingdomlib.workers import workerMap
 
 
 checktypes = ['http', 'httpcustom', 'tcp', 'ping', 'dns', 'udp', 'smtp',
@@ -10,8 +15,46 @@ legacy_notification_parameters = ['notifyagainevery', 'notifywhenbackup',
                                   'sendtoemail', 'sendtoiphone', 'sendtosms',
                                   'sendtotwitter']
 
-
-class PingdomCheck(object):
+# Maximum limit and offset accepted by results()
+results_page_size = 1000
+results_max_offset = 43200
+
+# Accepted parameters of the check summary calls, after renaming
+summary_parameters = {
+    'analysis': ['limit', 'offset', 'from', 'to'],
+    'averages': ['from', 'to', 'probes', 'includeuptime', 'bycountry',
+                 'byprobe'],
+    'hoursofday': ['from', 'to', 'probes', 'uselocaltime'],
+    'outages': ['from', 'to', 'order'],
+    'performance': ['from', 'to', 'resolution', 'includeuptime', 'probes',
+                    'order'],
+    'results': ['from', 'to', 'probes', 'status', 'limit', 'offset',
+                'includeanalysis', 'maxresponse', 'minresponse'],
+}
+
+
+def summaryParameters(call, kwargs):
+    """Prepares keyword arguments for one of the summary calls in
+        summary_parameters, returns the parameters to send to pingdom"""
+
+    # 'from' is a reserved word, use time_from instead
+    if kwargs.get('time_from'):
+        kwargs['from'] = kwargs.get('time_from')
+        del kwargs['time_from']
+    if kwargs.get('time_to'):
+        kwargs['to'] = kwargs.get('time_to')
+        del kwargs['time_to']
+
+    # Warn user about unhandled parameters
+    for key in kwargs:
+        if key not in summary_parameters[call]:
+            sys.stderr.write("'%s'" % key + ' is not a valid argument of ' +
+                             '<PingdomCheck>.%s()\n' % call)
+
+    return kwargs
+
+
+class PingdomCheck(ChangeTracking):
     """Class representing a check in pingdom
 
     Attributes:
@@ -42,12 +85,27 @@ class PingdomCheck(object):
         * probe_filters -- What region should the probe check from
     """
 
-    _detail_keys = ['name', 'resolution', 'sendtoemail', 'sendtosms',
-                    'sendtotwitter', 'sendtoiphone', 'paused', 'contactids',
-                    'sendnotificationwhendown', 'notifyagainevery',
-                    'notifywhenbackup', 'created', 'type', 'hostname',
-                    'status', 'lasterrortime', 'lasttesttime',
-                    'use_legacy_notifications', 'lastresponsetime', 'probe_filters',]
+    _detail_keys = frozenset(['name', 'resolution', 'sendtoemail', 'sendtosms',
+                              'sendtotwitter', 'sendtoiphone', 'paused',
+                              'contactids', 'sendnotificationwhendown',
+                              'notifyagainevery', 'notifywhenbackup',
+                              'created', 'type', 'hostname', 'status',
+                              'lasterrortime', 'lasttesttime',
+                              'use_legacy_notifications', 'lastresponsetime',
+                              'probe_filters'])
+
+    # Attributes whose changes are pushed to pingdom
+    _push_keys = frozenset(['paused', 'resolution', 'contactids',
+                            'sendtoemail', 'sendtosms', 'sendtotwitter',
+                            'sendtoiphone', 'sendnotificationwhendown',
+                            'notifyagainevery', 'notifywhenbackup', 'created',
+                            'hostname', 'status', 'lasterrortime',
+                            'lasttesttime', 'url', 'encryption', 'port',
+                            'auth', 'shouldcontain', 'shouldnotcontain',
+                            'postdata', 'additionalurls', 'stringtosend',
+                            'stringtoexpect', 'expectedip', 'nameserver',
+                            'use_legacy_notifications', 'host',
+                            'alert_policy', 'autoresolve', 'probe_filters'])
 
     def __init__(self, instantiator, checkinfo=dict()):
         self.pingdom = instantiator
@@ -64,20 +122,8 @@ class PingdomCheck(object):
 
     def __setattr__(self, key, value):
         # Autopush changes to attributes
-        if key in ['paused', 'resolution', 'contactids', 'sendtoemail',
-                   'sendtosms', 'sendtotwitter', 'sendtoiphone',
-                   'sendnotificationwhendown', 'notifyagainevery',
-                   'notifywhenbackup', 'created', 'hostname', 'status',
-                   'lasterrortime', 'lasttesttime', 'url', 'encryption',
-                   'port', 'auth', 'shouldcontain', 'shouldnotcontain',
-                   'postdata', 'additionalurls', 'stringtosend',
-                   'stringtoexpect', 'expectedip', 'nameserver',
-                   'use_legacy_notifications', 'host', 'alert_policy',
-                   'autoresolve', 'probe_filters']:
-            if self.pingdom.pushChanges:
-                self.modify(**{key: value})
-            else:
-                object.__setattr__(self, key, value)
+        if key in self._push_keys:
+            self._pushChange(key, value)
         object.__setattr__(self, key, value)
 
     def __str__(self):
@@ -123,19 +169,7 @@ class PingdomCheck(object):
         ]
         """
 
-        # 'from' is a reserved word, use time_from instead
-        if kwargs.get('time_from'):
-            kwargs['from'] = kwargs.get('time_from')
-            del kwargs['time_from']
-        if kwargs.get('time_to'):
-            kwargs['to'] = kwargs.get('time_to')
-            del kwargs['time_to']
-
-        # Warn user about unhandled kwargs
-        for key in kwargs:
-            if key not in ['limit', 'offset', 'from', 'to']:
-                sys.stderr.write('%s not a valid argument for analysis()\n'
-                                 % key)
+        kwargs = summaryParameters('analysis', kwargs)
 
         response = self.pingdom.request('GET', 'analysis/%s' % self.id,
                                         kwargs)
@@ -153,17 +187,17 @@ class PingdomCheck(object):
                     self.type = checkinfo[key]
                 else:
                     # Take key from type dict, convert to string for type
-                    self.type = checkinfo[key].iterkeys().next()
+                    self.type = list(checkinfo[key].keys())[0]
 
                     # Take value from type dict, store to member of new attrib
                     object.__setattr__(self, self.type,
-                                       checkinfo[key].itervalues().next())
+                                       checkinfo[key][self.type])
             else:
                 # Store other key value pairs as attributes
                 object.__setattr__(self, key, checkinfo[key])
 
         # back-fill missing keys (if any)
-        missing_keys = list(set(self._detail_keys) - set(checkinfo.keys()))
+        missing_keys = self._detail_keys.difference(checkinfo)
         for key in missing_keys:
             object.__setattr__(self, key, None)
 
@@ -175,9 +209,14 @@ class PingdomCheck(object):
     def getDetails(self):
         """Update check details, returns dictionary of details"""
 
+        self.pingdom._countDetailFetch()
+        return self._loadDetails()
+
+    def _loadDetails(self):
         response = self.pingdom.request('GET', 'checks/%s' % self.id)
-        self.__addDetails__(response.json()['check'])
-        return response.json()['check']
+        details = response.json()['check']
+        self.__addDetails__(details)
+        return details
 
     def modify(self, **kwargs):
         """Modify settings for a check. The provided settings will overwrite
@@ -433,20 +472,7 @@ class PingdomCheck(object):
         }
         """
 
-        # 'from' is a reserved word, use time_from instead
-        if kwargs.get('time_from'):
-            kwargs['from'] = kwargs.get('time_from')
-            del kwargs['time_from']
-        if kwargs.get('time_to'):
-            kwargs['to'] = kwargs.get('time_to')
-            del kwargs['time_to']
-
-        # Warn user about unhandled parameters
-        for key in kwargs:
-            if key not in ['from', 'to', 'probes', 'includeuptime',
-                           'bycountry', 'byprobe']:
-                sys.stderr.write("'%s'" % key + ' is not a valid argument of' +
-                                 '<PingdomCheck.averages()\n')
+        kwargs = summaryParameters('averages', kwargs)
 
         response = self.pingdom.request('GET', 'summary.average/%s' % self.id,
                                         kwargs)
@@ -492,19 +518,7 @@ class PingdomCheck(object):
         ]
         """
 
-        # 'from' is a reserved word, use time_from instead
-        if kwargs.get('time_from'):
-            kwargs['from'] = kwargs.get('time_from')
-            del kwargs['time_from']
-        if kwargs.get('time_to'):
-            kwargs['to'] = kwargs.get('time_to')
-            del kwargs['time_to']
-
-        # Warn user about unhanled parameters
-        for key in kwargs:
-            if key not in ['from', 'to', 'probes', 'uselocaltime']:
-                sys.stderr.write("'%s'" % key + ' is not a valid argument of' +
-                                 '<PingdomCheck.hoursofday()\n')
+        kwargs = summaryParameters('hoursofday', kwargs)
 
         response = self.pingdom.request('GET', 'summary.hoursofday/%s' %
                                         self.id, kwargs)
@@ -541,19 +555,7 @@ class PingdomCheck(object):
         ]
         """
 
-        # 'from' is a reserved word, use time_from instead
-        if kwargs.get('time_from'):
-            kwargs['from'] = kwargs.get('time_from')
-            del kwargs['time_from']
-        if kwargs.get('time_to'):
-            kwargs['to'] = kwargs.get('time_to')
-            del kwargs['time_to']
-
-        # Warn user about unhanled parameters
-        for key in kwargs:
-            if key not in ['from', 'to', 'order']:
-                sys.stderr.write("'%s'" % key + ' is not a valid argument of' +
-                                 '<PingdomCheck.outages()\n')
+        kwargs = summaryParameters('outages', kwargs)
 
         response = self.pingdom.request('GET', 'summary.outage/%s' % self.id,
                                         kwargs)
@@ -616,20 +618,7 @@ class PingdomCheck(object):
         }
         """
 
-        # 'from' is a reserved word, use time_from instead
-        if kwargs.get('time_from'):
-            kwargs['from'] = kwargs.get('time_from')
-            del kwargs['time_from']
-        if kwargs.get('time_to'):
-            kwargs['to'] = kwargs.get('time_to')
-            del kwargs['time_to']
-
-        # Warn user about unhanled parameters
-        for key in kwargs:
-            if key not in ['from', 'to', 'resolution', 'includeuptime',
-                           'probes', 'order']:
-                sys.stderr.write("'%s'" % key + ' is not a valid argument of' +
-                                 '<PingdomCheck.performance()\n')
+        kwargs = summaryParameters('performance', kwargs)
 
         response = self.pingdom.request('GET', 'summary.performance/%s' %
                                         self.id, kwargs)
@@ -718,25 +707,345 @@ class PingdomCheck(object):
         }
         """
 
-        # 'from' is a reserved word, use time_from instead
-        if kwargs.get('time_from'):
-            kwargs['from'] = kwargs.get('time_from')
-            del kwargs['time_from']
-        if kwargs.get('time_to'):
-            kwargs['to'] = kwargs.get('time_to')
-            del kwargs['time_to']
-
-        # Warn user about unhanled parameters
-        for key in kwargs:
-            if key not in ['from', 'to', 'probes', 'status', 'limit', 'offset',
-                           'includeanalysis', 'maxresponse', 'minresponse']:
-                sys.stderr.write("'%s'" % key + ' is not a valid argument of' +
-                                 '<PingdomCheck.results()\n')
+        kwargs = summaryParameters('results', kwargs)
 
         response = self.pingdom.request('GET', 'results/%s' % self.id, kwargs)
 
         return response.json()
 
+    def iterResults(self, time_from, time_to=None, shards=1, workers=None,
+                    **kwargs):
+        """Generator over all raw test results for this check between
+            time_from and time_to, newest first.
+
+        Pages through results() 1000 rows at a time. Once the maximum offset
+            is reached the window is moved below the oldest result seen, so
+            ranges of any size can be walked. Results are yielded as they
+            are decoded off the socket, pages are never held in full.
+
+        Long ranges can be split into shards, non-overlapping time windows
+            that are fetched in parallel and yielded back in time order. Each
+            shard in flight is held in memory.
+
+        Parameters:
+
+            * time_from -- Start time of period. Format is UNIX timestamp
+                    Type: Integer
+
+            * time_to -- End time of period. Format is UNIX timestamp
+                    Type: Integer
+                    Default: Current time
+
+            * shards -- Number of time windows to split the period into
+                    Type: Integer
+                    Default: 1
+
+            * workers -- Number of shards fetched at the same time
+                    Type: Integer
+                    Default: Pingdom workers setting
+
+        Accepts the filters of results() (probes, status, includeanalysis,
+            maxresponse, minresponse). Yields result dictionaries as
+            described in results().
+        """
+
+        # The api only takes whole seconds
+        time_from = int(time_from)
+        time_to = int(time_to or time.time())
+        if shards <= 1:
+            return self._iterResultsWindow(time_from, time_to, kwargs)
+
+        # Newest first, each shard ends a second before the next one starts
+        # so no result is fetched twice
+        size = max((time_to - time_from + 1) // shards, 1)
+        windows = []
+        end = time_to
+        while end >= time_from:
+            start = max(end - size + 1, time_from)
+            if len(windows) == shards - 1:
+                start = time_from
+            windows.append((start, end))
+            end = start - 1
+
+        def fetch(window):
+            return list(self._iterResultsWindow(window[0], window[1],
+                                                dict(kwargs)))
+
+        return self._iterShards(fetch, windows,
+                                workers or self.pingdom.workers)
+
+    def resultColumns(self, time_from, time_to=None, descriptions=False,
+                      **kwargs):
+        """Returns all raw test results between time_from and time_to as a
+            ResultColumns instance, see pingdomlib.columnar.
+
+        Results are appended to typed arrays page by page as iterResults()
+            walks the period, so the per-row dictionaries are never all held
+            at once. The columns can be exported with toNumpy(), toArrow(),
+            writeParquet() and writeCSV().
+
+        Parameters:
+
+            * time_from -- Start time of period. Format is UNIX timestamp
+                    Type: Integer
+
+            * time_to -- End time of period. Format is UNIX timestamp
+                    Type: Integer
+                    Default: Current time
+
+            * descriptions -- Keep the short status descriptions
+                    Type: Boolean
+                    Default: False
+
+        Accepts the other parameters of iterResults().
+        """
+
+        columns = ResultColumns(descriptions)
+        return columns.extend(self.iterResults(time_from, time_to, **kwargs))
+
+    def syncResults(self, store, time_from=None, overlap=0, **kwargs):
+        """Generator over the raw test results added since the last sync of
+            this check, newest first.
+
+        The time of the newest result synced is kept in store as the
+            watermark of the check, and the next sync only asks pingdom for
+            results from there on. Results sharing seconds with a previous
+            sync are skipped, so every result is yielded once.
+
+        The watermark only moves once the generator is exhausted. A sync
+            that is interrupted, by an error or by leaving the loop early,
+            is repeated in full by the next one.
+
+        Parameters:
+
+            * store -- Store keeping the watermarks
+                    Type: pingdomlib.store.ResultStore
+
+            * time_from -- Start time of the first sync. Format is UNIX
+                timestamp
+                    Type: Integer
+                    Default: 1 day prior to now
+
+            * overlap -- Seconds below the watermark to ask for again, to
+                catch results that pingdom records late
+                    Type: Integer
+                    Default: 0
+
+        Accepts the other parameters of iterResults(). Filters and overlap
+            must not change between syncs of a check, the watermark does not
+            track them. Yields result dictionaries as described in results().
+        """
+
+        watermark = store.watermark(self.id)
+        if watermark is None:
+            start = int(time_from or time.time() - 86400)
+            synced = set()
+        else:
+            start = watermark - overlap
+            synced = store.syncedKeys(self.id, start)
+
+        newest = None
+        keys = []
+        for result in self.iterResults(start, **kwargs):
+            key = (result['time'], result['probeid'])
+            if key in synced:
+                continue
+            if newest is None:
+                newest = max(result['time'], watermark or 0)
+            if result['time'] >= newest - overlap:
+                keys.append(key)
+            yield result
+
+        if newest is not None:
+            store.advance(self.id, newest, keys, overlap)
+
+    def _fillGaps(self, store, kind, time_from, time_to, fetch):
+        """Calls fetch(timefrom, timeto) for every range of time_from to
+            time_to missing from store, and records the final part of each
+            fetched range as covered"""
+
+        cutoff = store.cutoff(kind)
+        for start, end in store.gaps(self.id, kind, time_from, time_to):
+            fetch(start, end)
+            store.cover(self.id, kind, start, min(end, cutoff))
+
+    def storedResults(self, store, time_from, time_to=None, status=None,
+                      probes=None, workers=None):
+        """Returns the raw test results for this check between time_from and
+            time_to, newest first, answered from a local store.
+
+        Only the ranges missing from the store are fetched with
+            iterResults(), and saved for later calls. Results newer than the
+            store settle time are fetched on every call.
+
+        Parameters:
+
+            * store -- Store keeping the results
+                    Type: pingdomlib.store.ResultStore
+
+            * time_from -- Start time of period. Format is UNIX timestamp
+                    Type: Integer
+
+            * time_to -- End time of period. Format is UNIX timestamp
+                    Type: Integer
+                    Default: Current time
+
+            * status -- Filter to only return results with specified
+                statuses. Format is a comma separated list
+                    Type: String
+                    Default: All statuses
+
+            * probes -- Filter to only return results from a list of probes.
+                Format is a comma separated list of probe identifiers
+                    Type: String
+                    Default: All probes
+
+            * workers -- Number of time windows of a missing range fetched
+                at the same time
+                    Type: Integer
+                    Default: 1
+
+        Returns a list of result dictionaries as described in results().
+            Filters are applied locally, so every result of a missing range
+            is fetched and stored.
+        """
+
+        time_from = int(time_from)
+        time_to = int(time_to or time.time())
+
+        def fetch(start, end):
+            shards = max(min(workers or 1, (end - start) // 86400), 1)
+            page = []
+            for result in self.iterResults(start, end, shards=shards,
+                                           workers=workers):
+                page.append(result)
+                if len(page) == results_page_size:
+                    store.saveResults(self.id, page)
+                    page = []
+            store.saveResults(self.id, page)
+
+        self._fillGaps(store, 'results', time_from, time_to, fetch)
+        return store.queryResults(self.id, time_from, time_to, status, probes)
+
+    def storedOutages(self, store, time_from, time_to=None):
+        """Returns the status changes of this check overlapping time_from and
+            time_to, oldest first, answered from a local store.
+
+        Only the ranges missing from the store are fetched with outages().
+            See outages() for the returned structure.
+        """
+
+        time_from = int(time_from)
+        time_to = int(time_to or time.time())
+
+        def fetch(start, end):
+            # Blocking call, outages() is a coroutine on AsyncPingdomCheck
+            store.saveOutages(self.id, PingdomCheck.outages(
+                self, time_from=start, time_to=end), start, end)
+
+        self._fillGaps(store, 'outages', time_from, time_to, fetch)
+        return store.queryOutages(self.id, time_from, time_to)
+
+    def storedPerformance(self, store, time_from, time_to=None,
+                          resolution='hour'):
+        """Returns the performance sub intervals of this check starting
+            between time_from and time_to, oldest first, answered from a
+            local store.
+
+        Only the ranges missing from the store are fetched with
+            performance(), always including uptime. Intervals still in
+            progress are fetched on every call.
+
+        Returned structure:
+        [
+            {
+                'starttime'   : <Integer> Interval start. Format UNIX
+                                 timestamp
+                'avgresponse' : <Integer> Average response time for this
+                                 interval in milliseconds
+                'uptime'      : <Integer> Total uptime for this interval in
+                                 seconds
+                'downtime'    : <Integer> Total downtime for this interval
+                                 in seconds
+                'unmonitored' : <Integer> Total unmonitored time for this
+                                 interval in seconds
+            },
+            ...
+        ]
+        """
+
+        time_from = int(time_from)
+        time_to = int(time_to or time.time())
+
+        def fetch(start, end):
+            summary = PingdomCheck.performance(self, time_from=start,
+                                               time_to=end,
+                                               resolution=resolution,
+                                               includeuptime=True)
+            store.savePerformance(self.id, resolution,
+                                  summary.get(resolution + 's', []))
+
+        self._fillGaps(store, 'performance/%s' % resolution, time_from,
+                       time_to, fetch)
+        return store.queryPerformance(self.id, resolution, time_from,
+                                      time_to)
+
+    @staticmethod
+    def _iterShards(fetch, windows, workers):
+        for window, results in workerMap(fetch, windows, workers):
+            for result in results:
+                yield result
+
+    def _iterResultsWindow(self, time_from, time_to, kwargs):
+        """Generator behind iterResults() walking a single time window"""
+
+        kwargs = summaryParameters('results', kwargs)
+        for key in ['limit', 'offset']:
+            if key in kwargs:
+                sys.stderr.write("'%s' is managed by " % key +
+                                 '<PingdomCheck>.iterResults()\n')
+                del kwargs[key]
+
+        kwargs['from'] = time_from
+        kwargs['to'] = time_to
+
+        # Results at the edge of a window that were already yielded
+        seen = set()
+        while True:
+            offset = 0
+            oldest = None
+            boundary = set()
+            while offset <= results_max_offset:
+                kwargs['limit'] = results_page_size
+                kwargs['offset'] = offset
+                response = self.pingdom.request('GET', 'results/%s' % self.id,
+                                                kwargs, stream=True)
+                count = 0
+                for result in self.pingdom._iterItems(response,
+                                                      ('results',)):
+                    count += 1
+                    key = (result['time'], result['probeid'])
+                    if key in seen:
+                        continue
+                    if oldest is None or result['time'] < oldest:
+                        oldest = result['time']
+                        boundary = set()
+                    if result['time'] == oldest:
+                        boundary.add(key)
+                    yield result
+
+                if count < results_page_size:
+                    return
+                offset += results_page_size
+
+            if oldest is None or oldest == kwargs['to']:
+                # Window can't be moved, nothing new is reachable
+                return
+
+            # Offset limit reached, continue below the oldest result seen
+            kwargs['to'] = oldest
+            seen = boundary
+
     def publishPublicReport(self):
         """Activate public report for this check.
 
@@ -753,3 +1062,66 @@ class PingdomCheck(object):
         response = self.pingdom.request('DELETE',
                                         'reports.public/%s' % self.id)
         return response.json()['message']
+
+
+class PingdomCheckRecord(object):
+    """Compact, read-only snapshot of a check as listed by getChecks()
+
+    Holds the listing attributes in slots instead of an instance dictionary
+    and sends no requests, which keeps tens of thousands of checks cheap to
+    hold and to pickle between processes. Use toCheck() for a PingdomCheck
+    that can fetch details and push changes.
+
+    Attributes:
+
+        * id -- Check identifier
+        * name -- Check name
+        * type -- Check type
+        * hostname -- Target host
+        * resolution -- How often should the check be tested. In minutes
+        * status -- Current status of check
+        * paused -- True if the check is paused
+        * created -- Creation time. Format is UNIX timestamp
+        * lasterrortime -- Timestamp of last error (if any)
+        * lasttesttime -- Timestamp of last test (if any)
+        * lastresponsetime -- Response time (in milliseconds) of last test
+        * probe_filters -- What region should the probe check from
+        * tags -- Tags of the check, if listed
+
+    Attributes missing from the listing are None.
+    """
+
+    __slots__ = ('id', 'name', 'type', 'hostname', 'resolution', 'status',
+                 'paused', 'created', 'lasterrortime', 'lasttesttime',
+                 'lastresponsetime', 'probe_filters', 'tags')
+
+    def __init__(self, checkinfo):
+        for key in self.__slots__:
+            object.__setattr__(self, key, checkinfo.get(key))
+
+        checktype = checkinfo.get('type')
+        if isinstance(checktype, dict):
+            object.__setattr__(self, 'type', list(checktype.keys())[0])
+        object.__setattr__(self, 'paused', self.status == 'paused')
+
+    def __setattr__(self, key, value):
+        raise AttributeError("'PingdomCheckRecord' object is read-only")
+
+    def __reduce__(self):
+        return (PingdomCheckRecord, (self.toDict(),))
+
+    def __str__(self):
+        return "<PingdomCheckRecord (%s)%s is '%s'>" % (self.id, self.name,
+                                                        self.status)
+
+    def toDict(self):
+        """Returns the attributes as a dictionary"""
+
+        return dict((key, getattr(self, key)) for key in self.__slots__)
+
+    def toCheck(self, pingdom):
+        """Returns a PingdomCheck bound to a Pingdom instance"""
+
+        checkinfo = self.toDict()
+        del checkinfo['paused']
+        return PingdomCheck(pingdom, checkinfo)
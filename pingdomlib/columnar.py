@@ -0,0 +1,155 @@
+import csv
+
+from array import array
+
+# Python 2 arrays have no 'q' typecode, 'l' is 64 bit on most of its platforms
+try:
+    array('q')
+    time_typecode = 'q'
+except ValueError:
+    time_typecode = 'l'
+
+
+class DictionaryColumn(object):
+    """Column of repeated values, stored as small integer codes pointing into
+        a list of distinct values
+
+    Attributes:
+
+        * codes -- array of int16 codes, one per row
+        * values -- List of distinct values, indexed by code
+    """
+
+    def __init__(self):
+        self.codes = array('h')
+        self.values = []
+        self._index = {}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, row):
+        return self.values[self.codes[row]]
+
+    def append(self, value):
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+
+class ResultColumns(object):
+    """Raw test results stored column by column in typed arrays
+
+    Uses a fraction of the memory of the result dictionaries returned by
+    PingdomCheck.results(), and the arrays can be handed to NumPy or Arrow
+    without copying.
+
+    Attributes:
+
+        * time -- array of int64 test times. Format is UNIX timestamp
+        * responsetime -- array of int32 response times in milliseconds
+        * status -- DictionaryColumn of result statuses
+        * probeid -- DictionaryColumn of probe identifiers
+        * statusdesc -- DictionaryColumn of short status descriptions, None
+            unless descriptions are kept
+
+    Parameters:
+
+        * descriptions -- Keep the short status descriptions
+                Type: Boolean
+                Default: False
+    """
+
+    def __init__(self, descriptions=False):
+        self.time = array(time_typecode)
+        self.responsetime = array('i')
+        self.status = DictionaryColumn()
+        self.probeid = DictionaryColumn()
+        self.statusdesc = DictionaryColumn() if descriptions else None
+
+    def __len__(self):
+        return len(self.time)
+
+    def append(self, result):
+        """Adds a result dictionary as described in PingdomCheck.results()"""
+
+        self.time.append(result['time'])
+        self.responsetime.append(result.get('responsetime') or 0)
+        self.status.append(result['status'])
+        self.probeid.append(result['probeid'])
+        if self.statusdesc is not None:
+            self.statusdesc.append(result.get('statusdesc'))
+
+    def extend(self, results):
+        """Adds every result of an iterable of result dictionaries"""
+
+        for result in results:
+            self.append(result)
+        return self
+
+    def _columns(self):
+        columns = [('time', self.time), ('responsetime', self.responsetime),
+                   ('status', self.status), ('probeid', self.probeid)]
+        if self.statusdesc is not None:
+            columns.append(('statusdesc', self.statusdesc))
+        return columns
+
+    def toNumpy(self):
+        """Returns a dictionary of NumPy arrays sharing memory with the
+            columns. Dictionary columns are returned as '<name>' holding the
+            codes and '<name>_values' holding the distinct values"""
+
+        try:
+            import numpy
+        except ImportError:
+            raise Exception("numpy is required for ResultColumns.toNumpy()")
+
+        arrays = {}
+        for name, column in self._columns():
+            if isinstance(column, DictionaryColumn):
+                arrays[name] = numpy.frombuffer(column.codes, numpy.int16)
+                arrays[name + '_values'] = numpy.array(column.values)
+            else:
+                arrays[name] = numpy.frombuffer(
+                    column, numpy.dtype('i%d' % column.itemsize))
+        return arrays
+
+    def toArrow(self):
+        """Returns a pyarrow Table, dictionary columns as DictionaryArrays"""
+
+        try:
+            import pyarrow
+        except ImportError:
+            raise Exception("pyarrow is required for ResultColumns.toArrow()")
+
+        names = []
+        arrays = []
+        for name, column in self._columns():
+            names.append(name)
+            if isinstance(column, DictionaryColumn):
+                arrays.append(pyarrow.DictionaryArray.from_arrays(
+                    pyarrow.array(column.codes, pyarrow.int16()),
+                    pyarrow.array(column.values)))
+            elif column.typecode == time_typecode:
+                arrays.append(pyarrow.array(column, pyarrow.int64()))
+            else:
+                arrays.append(pyarrow.array(column, pyarrow.int32()))
+        return pyarrow.Table.from_arrays(arrays, names=names)
+
+    def writeParquet(self, path):
+        """Writes the columns to a Parquet file, requires pyarrow"""
+
+        table = self.toArrow()
+        import pyarrow.parquet
+        pyarrow.parquet.write_table(table, path)
+
+    def writeCSV(self, fileobj):
+        """Writes the columns as CSV with a header row to a file object"""
+
+        columns = self._columns()
+        writer = csv.writer(fileobj)
+        writer.writerow([name for name, column in columns])
+        for row in range(len(self)):
+            writer.writerow([column[row] for name, column in columns])
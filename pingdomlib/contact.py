@@ -1,7 +1,9 @@
 import sys
 
+from pingdomlib.changes import ChangeTracking
 
-class PingdomContact(object):
+
+class PingdomContact(ChangeTracking):
     """Class representing a pingdom contact
 
     Attributes:
@@ -19,19 +21,20 @@ class PingdomContact(object):
         * paused -- True if contact is paused
         """
 
+    # Attributes whose changes are pushed to pingdom
+    _push_keys = frozenset(['name', 'email', 'cellphone', 'countryiso',
+                            'defaultsmsprovider', 'directtwitter',
+                            'twitteruser', 'iphonetokens', 'androidtokens',
+                            'paused'])
+
     def __init__(self, instantiator, contactinfo=dict()):
         self.pingdom = instantiator
         self.__addDetails__(contactinfo)
 
     def __setattr__(self, key, value):
         # Autopush changes to attributes
-        if key in ['name', 'email', 'cellphone', 'countryiso',
-                   'defaultsmsprovider', 'directtwitter', 'twitteruser',
-                   'iphonetokens', 'androidtokens', 'paused']:
-            if self.pingdom.pushChanges:
-                self.modify(**{key: value})
-            else:
-                object.__setattr__(self, key, value)
+        if key in self._push_keys:
+            self._pushChange(key, value)
         object.__setattr__(self, key, value)
 
     def __addDetails__(self, contactinfo):
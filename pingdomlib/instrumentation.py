@@ -0,0 +1,356 @@
+import bisect
+import collections
+import threading
+import time
+
+# Upper bounds in seconds of the EndpointStats latency buckets
+latency_buckets = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Connection timings of the request in progress on each thread
+_local = threading.local()
+
+
+def startTimings():
+    """Starts collecting the connection timings of the requests sent on this
+        thread, until stopTimings() is called"""
+
+    _local.timings = {}
+
+
+def stopTimings():
+    """Returns the connection timings collected since startTimings()"""
+
+    timings = getattr(_local, 'timings', None) or {}
+    _local.timings = None
+    return timings
+
+
+def _record(name, seconds):
+    timings = getattr(_local, 'timings', None)
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def _timedConnection(connection):
+    """Returns a subclass of a urllib3 connection class recording how long
+        opening the socket and the whole connect, TLS included, take"""
+
+    class TimedConnection(connection):
+
+        def _new_conn(self):
+            start = time.time()
+            try:
+                return connection._new_conn(self)
+            finally:
+                _record('socket', time.time() - start)
+
+        def connect(self):
+            start = time.time()
+            try:
+                return connection.connect(self)
+            finally:
+                _record('connect', time.time() - start)
+
+    TimedConnection.__name__ = 'Timed' + connection.__name__
+    return TimedConnection
+
+
+def timeConnections(adapter):
+    """Makes the connection pools of a requests HTTPAdapter record connect
+        and TLS handshake times, see startTimings()"""
+
+    manager = adapter.poolmanager
+    # urllib3 before 1.8 only has a module level mapping, shared by every
+    # pool manager. Connections aren't timed there
+    pools = getattr(manager, 'pool_classes_by_scheme', None)
+    if pools is None:
+        return
+    classes = {}
+    for scheme, pool in pools.items():
+        classes[scheme] = type('Timed' + pool.__name__, (pool,), {
+            'ConnectionCls': _timedConnection(pool.ConnectionCls)})
+    # The default mapping is shared by every pool manager, replace it
+    manager.pool_classes_by_scheme = classes
+
+
+def requestTimings(timings, elapsed, total):
+    """Splits the time of a request into its phases
+
+    Parameters:
+
+        * timings -- Connection timings, see stopTimings()
+                Type: Dictionary
+
+        * elapsed -- Seconds until the response headers were received
+                Type: Float
+
+        * total -- Seconds until the body was read, None if it wasn't
+                Type: Float
+
+    Returned structure:
+    {
+        'connect'  : <Float> Name resolution and TCP connect, 0 when a pooled
+                      connection was reused
+        'tls'      : <Float> TLS handshake
+        'server'   : <Float> Sending the request and waiting for the
+                      response headers
+        'transfer' : <Float> Reading the body, None until it is read
+        'total'    : <Float> Whole request, None until the body is read
+    }
+    """
+
+    connect = timings.get('connect', 0.0)
+    socket = timings.get('socket', connect)
+    return {'connect': socket,
+            'tls': max(connect - socket, 0.0),
+            'server': max(elapsed - connect, 0.0),
+            'transfer': None if total is None else max(total - elapsed, 0.0),
+            'total': total}
+
+
+class RequestHook(object):
+    """Base class of request hooks, see Pingdom hooks
+
+    Every attempt of Pingdom.request() creates an event dictionary that is
+    passed to preRequest() before it is sent, then to postResponse() once
+    the response is read, or to error() when the request fails for good.
+    retry() is called instead when the attempt is retried. Hooks can keep
+    their own state in the event between calls.
+
+    Event structure:
+    {
+        'method'     : <String> HTTP method
+        'endpoint'   : <String> Endpoint, 'checks' for 'checks/123'
+        'url'        : <String> Url relative to the api root
+        'attempt'    : <Integer> Attempt number, starting at 1
+        'start'      : <Float> Time the attempt started
+        'queued'     : <Float> Seconds waited for the rate limiter
+        'status'     : <Integer> HTTP status, None without a response
+        'bytes'      : <Integer> Bytes received, before decompression
+        'decoded'    : <Integer> Bytes of the decompressed body
+        'timings'    : <Dictionary> See requestTimings()
+        'shortlimit' : <RateLimit> Short rate limit reported, or None
+        'longlimit'  : <RateLimit> Long rate limit reported, or None
+        'error'      : <Exception> Error of the attempt, or None
+        'delay'      : <Float> Seconds before the retry, for retry()
+    }
+
+    Exceptions raised by hooks are written to stderr and otherwise ignored.
+    """
+
+    def preRequest(self, event):
+        pass
+
+    def postResponse(self, event):
+        pass
+
+    def retry(self, event):
+        pass
+
+    def error(self, event):
+        pass
+
+
+class EndpointStats(RequestHook):
+    """Hook aggregating requests per method and endpoint, to find slow
+        endpoints without an external metrics system
+
+    Attributes:
+
+        * stats -- Dictionary of statistics per (method, endpoint) tuple
+            {
+                'requests' : <Integer> Responses received
+                'seconds'  : <Float> Total time of the requests
+                'maxtime'  : <Float> Slowest request
+                'buckets'  : <List> Requests per latency_buckets bound, the
+                              last entry counts slower ones
+                'bytes'    : <Integer> Bytes received
+                'retries'  : <Integer> Attempts retried
+                'errors'   : <Integer> Requests failed for good
+                'phases'   : <Dictionary> Total seconds per request phase
+            }
+    """
+
+    def __init__(self, buckets=latency_buckets):
+        self.buckets = tuple(buckets)
+        self.stats = collections.defaultdict(self._new)
+        self._lock = threading.Lock()
+
+    def _new(self):
+        return {'requests': 0, 'seconds': 0.0, 'maxtime': 0.0,
+                'buckets': [0] * (len(self.buckets) + 1), 'bytes': 0,
+                'retries': 0, 'errors': 0,
+                'phases': dict((phase, 0.0) for phase in
+                               ['connect', 'tls', 'server', 'transfer'])}
+
+    def postResponse(self, event):
+        seconds = time.time() - event['start']
+        with self._lock:
+            stats = self.stats[(event['method'], event['endpoint'])]
+            stats['requests'] += 1
+            stats['seconds'] += seconds
+            stats['maxtime'] = max(stats['maxtime'], seconds)
+            stats['buckets'][bisect.bisect_left(self.buckets, seconds)] += 1
+            stats['bytes'] += event['bytes'] or 0
+            for phase, value in event['timings'].items():
+                if phase in stats['phases'] and value:
+                    stats['phases'][phase] += value
+
+    def retry(self, event):
+        with self._lock:
+            self.stats[(event['method'], event['endpoint'])]['retries'] += 1
+
+    def error(self, event):
+        with self._lock:
+            self.stats[(event['method'], event['endpoint'])]['errors'] += 1
+
+    def slowest(self, count=10):
+        """Returns the (method, endpoint) tuples with the highest average
+            request time, slowest first"""
+
+        with self._lock:
+            averages = [(stats['seconds'] / stats['requests'], key)
+                        for key, stats in self.stats.items()
+                        if stats['requests']]
+        return [key for average, key in sorted(averages, reverse=True)
+                [:count]]
+
+
+class PrometheusHook(RequestHook):
+    """Hook exporting request metrics with prometheus_client
+
+    Metrics:
+
+        * <prefix>_request_seconds -- Histogram by method, endpoint, status
+        * <prefix>_request_phase_seconds -- Histogram by endpoint, phase
+        * <prefix>_received_bytes_total -- Counter by endpoint
+        * <prefix>_retries_total -- Counter by endpoint, reason
+        * <prefix>_errors_total -- Counter by endpoint, error
+        * <prefix>_ratelimit_remaining -- Gauge by window
+
+    Parameters:
+
+        * registry -- Registry the metrics are added to
+                Type: prometheus_client.CollectorRegistry
+                Default: prometheus_client.REGISTRY
+
+        * prefix -- Prefix of the metric names
+                Type: String
+                Default: 'pingdom'
+
+        * buckets -- Upper bounds of the latency histograms in seconds
+                Type: Tuple
+                Default: latency_buckets
+    """
+
+    def __init__(self, registry=None, prefix='pingdom',
+                 buckets=latency_buckets):
+        try:
+            import prometheus_client
+        except ImportError:
+            raise Exception("prometheus_client is required for "
+                            "PrometheusHook")
+        if registry is None:
+            registry = prometheus_client.REGISTRY
+
+        self.duration = prometheus_client.Histogram(
+            prefix + '_request_seconds', 'Time of pingdom api requests',
+            ['method', 'endpoint', 'status'], registry=registry,
+            buckets=buckets)
+        self.phases = prometheus_client.Histogram(
+            prefix + '_request_phase_seconds',
+            'Time of pingdom api requests per phase',
+            ['endpoint', 'phase'], registry=registry, buckets=buckets)
+        self.received = prometheus_client.Counter(
+            prefix + '_received_bytes', 'Bytes received from the pingdom api',
+            ['endpoint'], registry=registry)
+        self.retries = prometheus_client.Counter(
+            prefix + '_retries', 'Pingdom api requests retried',
+            ['endpoint', 'reason'], registry=registry)
+        self.errors = prometheus_client.Counter(
+            prefix + '_errors', 'Pingdom api requests failed',
+            ['endpoint', 'error'], registry=registry)
+        self.remaining = prometheus_client.Gauge(
+            prefix + '_ratelimit_remaining',
+            'Requests left in the pingdom api rate limit windows',
+            ['window'], registry=registry)
+
+    def postResponse(self, event):
+        endpoint = event['endpoint']
+        self.duration.labels(event['method'], endpoint,
+                             str(event['status'])).observe(
+                                 time.time() - event['start'])
+        for phase, value in event['timings'].items():
+            if phase != 'total' and value is not None:
+                self.phases.labels(endpoint, phase).observe(value)
+        if event['bytes']:
+            self.received.labels(endpoint).inc(event['bytes'])
+        for window in ['short', 'long']:
+            limit = event[window + 'limit']
+            if limit is not None:
+                self.remaining.labels(window).set(limit.remaining)
+
+    def retry(self, event):
+        reason = event['status'] or type(event['error']).__name__
+        self.retries.labels(event['endpoint'], str(reason)).inc()
+
+    def error(self, event):
+        error = event['status'] or type(event['error']).__name__
+        self.errors.labels(event['endpoint'], str(error)).inc()
+
+
+class OpenTelemetryHook(RequestHook):
+    """Hook recording every attempt as an OpenTelemetry client span, with
+        the request phases as attributes
+
+    Parameters:
+
+        * tracer -- Tracer creating the spans
+                Type: opentelemetry.trace.Tracer
+                Default: trace.get_tracer('pingdomlib')
+    """
+
+    def __init__(self, tracer=None):
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise Exception("opentelemetry-api is required for "
+                            "OpenTelemetryHook")
+        self.trace = trace
+        self.tracer = tracer or trace.get_tracer('pingdomlib')
+
+    def preRequest(self, event):
+        event['span'] = self.tracer.start_span(
+            'pingdom %s %s' % (event['method'], event['endpoint']),
+            kind=self.trace.SpanKind.CLIENT,
+            attributes={'http.method': event['method'],
+                        'http.url': event['url'],
+                        'pingdom.endpoint': event['endpoint'],
+                        'pingdom.attempt': event['attempt']})
+
+    def _end(self, event):
+        span = event.pop('span', None)
+        if span is None:
+            return
+        if event['status'] is not None:
+            span.set_attribute('http.status_code', event['status'])
+        if event['bytes'] is not None:
+            span.set_attribute('pingdom.bytes', event['bytes'])
+        for phase, value in (event['timings'] or {}).items():
+            if value is not None:
+                span.set_attribute('pingdom.%s_seconds' % phase, value)
+        if event['error'] is not None:
+            span.record_exception(event['error'])
+        if event['error'] is not None or (event['status'] or 0) >= 400:
+            span.set_status(self.trace.Status(
+                self.trace.StatusCode.ERROR))
+        span.end()
+
+    def postResponse(self, event):
+        self._end(event)
+
+    def retry(self, event):
+        self._end(event)
+
+    def error(self, event):
+        self._end(event)
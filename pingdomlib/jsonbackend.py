@@ -0,0 +1,74 @@
+import json
+
+import requests
+
+from requests.adapters import HTTPAdapter
+
+# Backends tried in order when none is chosen, the fastest first
+preferred_backends = ['orjson', 'simdjson', 'ujson', 'json']
+
+
+def loadBackend(name=None):
+    """Returns a (name, loads) tuple for a JSON backend. loads() accepts
+        bytes and returns the decoded document
+
+    Parameters:
+
+        * name -- 'orjson', 'simdjson', 'ujson' or 'json'. The first of
+            preferred_backends that is installed when None
+                Type: String
+                Default: None
+    """
+
+    for backend in [name] if name else preferred_backends:
+        try:
+            if backend == 'orjson':
+                import orjson
+                return backend, orjson.loads
+            if backend == 'simdjson':
+                import simdjson
+                return backend, simdjson.loads
+            if backend == 'ujson':
+                import ujson
+                return backend, ujson.loads
+            if backend == 'json':
+                return backend, json.loads
+        except ImportError:
+            if name:
+                raise
+            continue
+        raise Exception("Invalid JSON backend '%s'" % backend)
+
+
+class JSONResponse(requests.Response):
+    """Response decoding its body with the loads() of a JSON backend"""
+
+    loads = staticmethod(json.loads)
+
+    def json(self, **kwargs):
+        # Options are specific to the stdlib decoder
+        if kwargs:
+            return requests.Response.json(self, **kwargs)
+        return self.loads(self.content)
+
+
+class JSONAdapter(HTTPAdapter):
+    """HTTPAdapter building JSONResponse instances
+
+    Parameters:
+
+        * loads -- Function decoding a response body, see loadBackend()
+                Type: Callable
+
+    Accepts the parameters of HTTPAdapter.
+    """
+
+    def __init__(self, loads, **kwargs):
+        self.loads = loads
+        HTTPAdapter.__init__(self, **kwargs)
+
+    def build_response(self, req, resp):
+        response = HTTPAdapter.build_response(self, req, resp)
+        response.__class__ = JSONResponse
+        response.loads = self.loads
+        return response
@@ -0,0 +1,156 @@
+import codecs
+import json
+
+whitespace = ' \t\n\r'
+number_start = '-0123456789'
+number_characters = '0123456789.eE+-'
+
+
+class JSONStream(object):
+    """Incremental reader of a JSON document arriving in chunks
+
+    Values are decoded with the stdlib decoder as soon as they are complete
+    in the buffer, which only holds the part of the document not consumed
+    yet.
+
+    Parameters:
+
+        * chunks -- Iterable of bytes or text chunks, such as
+            response.iter_content()
+                Type: Iterable
+
+        * decoder -- Decoder whose raw_decode() decodes the values
+                Type: json.JSONDecoder
+                Default: json.JSONDecoder()
+    """
+
+    def __init__(self, chunks, decoder=None):
+        self.chunks = iter(chunks)
+        self.decoder = decoder or json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def _read(self):
+        """Appends the next chunk to the buffer, returns False at the end
+            of the document"""
+
+        if self.eof:
+            return False
+        for chunk in self.chunks:
+            if isinstance(chunk, bytes):
+                chunk = self.utf8.decode(chunk)
+            if not chunk:
+                continue
+            # Drop what was consumed so the buffer stays small
+            self.buffer = self.buffer[self.position:] + chunk
+            self.position = 0
+            return True
+        self.buffer = self.buffer[self.position:] + self.utf8.decode(b'',
+                                                                     True)
+        self.position = 0
+        self.eof = True
+        return False
+
+    def peek(self):
+        """Returns the next character that is not whitespace, None at the
+            end of the document"""
+
+        while True:
+            while (self.position < len(self.buffer) and
+                   self.buffer[self.position] in whitespace):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._read():
+                return None
+
+    def expect(self, characters):
+        """Consumes the next character, which must be one of characters"""
+
+        # Compact documents have the character right there
+        if self.position < len(self.buffer):
+            character = self.buffer[self.position]
+            if character in characters:
+                self.position += 1
+                return character
+
+        character = self.peek()
+        if character is None or character not in characters:
+            raise ValueError('Expected %s at %r in JSON stream' % (
+                ' or '.join(repr(c) for c in characters), character))
+        self.position += 1
+        return character
+
+    def value(self):
+        """Decodes and returns the next complete value"""
+
+        if (self.position >= len(self.buffer) or
+                self.buffer[self.position] in whitespace):
+            self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer,
+                                                     self.position)
+            except ValueError:
+                if not self._read():
+                    raise
+                continue
+            # A number at the end of the buffer, or cut at a '.' or exponent
+            # raw_decode() stopped at, may continue in the next chunk
+            if (self.buffer[self.position] in number_start and
+                    (end == len(self.buffer) or
+                     self.buffer[end] in number_characters) and
+                    self._read()):
+                continue
+            self.position = end
+            return value
+
+
+def iterItems(chunks, path, decoder=None):
+    """Generator over the items of the array found at path in a JSON document,
+        yielding each item as soon as it is decoded. Yields nothing when the
+        document has no such array.
+
+    Parameters:
+
+        * chunks -- Iterable of bytes or text chunks
+                Type: Iterable
+
+        * path -- Keys leading to the array, ('actions', 'alerts') for
+            {"actions": {"alerts": [...]}}
+                Type: Tuple
+
+        * decoder -- Decoder whose raw_decode() decodes the items
+                Type: json.JSONDecoder
+                Default: json.JSONDecoder()
+    """
+
+    stream = JSONStream(chunks, decoder)
+
+    for key in path:
+        if stream.peek() != '{':
+            return
+        stream.expect('{')
+        while True:
+            if stream.peek() == '}':
+                return
+            name = stream.value()
+            stream.expect(':')
+            if name == key:
+                break
+            # Other values are skipped whole, they are expected to be small
+            stream.value()
+            if stream.expect(',}') == '}':
+                return
+
+    if stream.peek() != '[':
+        return
+    stream.expect('[')
+    if stream.peek() == ']':
+        return
+    while True:
+        yield stream.value()
+        if stream.expect(',]') == ']':
+            return
@@ -1,13 +1,90 @@
+import collections
+import functools
 import requests
 import sys
+import threading
+import time
 
-from pingdomlib.check import PingdomCheck
+from pingdomlib.check import PingdomCheck, PingdomCheckRecord
 from pingdomlib.contact import PingdomContact
+from pingdomlib.instrumentation import (requestTimings, startTimings,
+                                        stopTimings, timeConnections)
+from pingdomlib.jsonbackend import JSONAdapter, loadBackend
+from pingdomlib.jsonstream import iterItems
+from pingdomlib.ratelimit import RateLimit, RateLimiter
+from pingdomlib.reconcile import CheckReconciler
 from pingdomlib.reports import PingdomEmailReport, PingdomSharedReport
+from pingdomlib.retry import RetryPolicy, retryable_errors
+from pingdomlib.workers import workerMap
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
 
 server_address = 'https://api.pingdom.com'
 api_version = '2.0'
 
+# Bytes read from the socket at a time by streamed responses
+stream_chunk_size = 65536
+
+# Single check detail fetches before suggesting hydrate()
+detail_fetch_warning = 50
+
+# Maximum length of identifier lists sent in a single bulk call, keeps
+# query strings well below common URL length limits
+bulk_ids_length = 1500
+
+# Parameters accepted by newCheck(), per check type
+newcheck_common_parameters = ['paused', 'resolution', 'contactids',
+                              'sendtoemail', 'sendtosms', 'sendtotwitter',
+                              'sendtoiphone', 'sendtoandroid',
+                              'sendnotificationwhendown', 'notifyagainevery',
+                              'notifywhenbackup', 'type', 'hostname',
+                              'use_legacy_notifications']
+newcheck_parameters = {
+    'http': newcheck_common_parameters + ['alert_policy', 'autoresolve',
+                                          'url', 'encryption', 'port', 'auth',
+                                          'shouldcontain', 'shouldnotcontain',
+                                          'postdata'],
+    'httpcustom': newcheck_common_parameters + ['url', 'encryption', 'port',
+                                                'auth', 'additionalurls'],
+    'tcp': newcheck_common_parameters + ['alert_policy', 'autoresolve',
+                                         'port', 'stringtosend',
+                                         'stringtoexpect'],
+    'ping': newcheck_common_parameters,
+    'dns': newcheck_common_parameters + ['expectedip', 'nameserver'],
+    'udp': newcheck_common_parameters + ['port', 'stringtosend',
+                                         'stringtoexpect'],
+    'smtp': newcheck_common_parameters + ['port', 'auth', 'stringtoexpect',
+                                          'encryption'],
+    'pop3': newcheck_common_parameters + ['port', 'stringtoexpect',
+                                          'encryption'],
+    'imap': newcheck_common_parameters + ['port', 'stringtoexpect',
+                                          'encryption'],
+}
+
+# Maximum limit accepted by actions()
+actions_page_size = 300
+
+
+class BulkCallError(Exception):
+    """Raised by bulk calls when requests for some chunks of identifiers
+        failed
+
+    Attributes:
+
+        * results -- List of (<String> chunk identifiers, <String> status
+            message or the exception raised) tuples, one per chunk
+        * errors -- Exceptions raised by the failed chunks
+    """
+
+    def __init__(self, results, errors):
+        Exception.__init__(self, '%d of %d bulk calls failed, first error: '
+                           '%r' % (len(errors), len(results), errors[0]))
+        self.results = results
+        self.errors = errors
+
 
 class Pingdom(object):
     """Main connection object to interact with pingdom
@@ -15,15 +92,126 @@ class Pingdom(object):
     Attributes:
 
         * pushChanges -- This boolean controls if changes are automatically
-            pushed to pingdom
+            pushed to pingdom. When disabled changes are kept until flush()
 
         * shortlimit -- String containing short api rate limit details
 
         * longlimit -- String containing long api rate limit details
+
+        * ratelimiter -- RateLimiter scheduling requests within the api rate
+            limits, None when disabled. See budget()
+
+        * retrypolicy -- RetryPolicy deciding which failed requests are sent
+            again. Its stats attribute counts the retries spent
+
+        * session -- requests.Session keeping connections to pingdom alive
+            between calls
+
+        * cache -- ResponseCache serving GET calls, None when disabled. Its
+            stats attribute counts hits and misses
+
+        * workers -- Number of threads used by calls that send requests in
+            parallel
+
+        * detailfetches -- Number of checks whose details were fetched one
+            at a time since the last hydrate()
+
+        * bytesreceived -- Response body bytes received over the wire
+
+        * bytesdecoded -- Response body bytes after decompression
+
+    Connection pooling parameters:
+
+        * pool_connections -- Number of per-host connection pools to cache
+                Type: Integer
+                Default: 10
+
+        * pool_maxsize -- Maximum number of connections kept alive per host
+                Type: Integer
+                Default: 10
+
+        * pool_block -- Block when all connections to a host are in use
+            instead of opening extra, non-pooled connections
+                Type: Boolean
+                Default: False
+
+    Parallelism parameters:
+
+        * workers -- Number of requests sent at the same time by calls that
+            work in parallel, such as PingdomCheck.iterResults() with shards.
+            Keep it within pool_maxsize so connections are reused
+                Type: Integer
+                Default: 8
+
+    Compression parameters:
+
+        * compression -- Ask pingdom for gzip or deflate compressed
+            responses, which are decompressed while they are read. Large
+            results() and actions() payloads shrink about tenfold
+                Type: Boolean
+                Default: True
+
+    Rate limiting parameters:
+
+        * ratelimit -- Wait for the api rate limits to reset instead of
+            sending requests pingdom will refuse
+                Type: Boolean
+                Default: True
+
+        * pace -- Spread the remaining requests evenly until the rate limits
+            reset rather than sending them as fast as possible
+                Type: Boolean
+                Default: False
+
+    Retry parameters:
+
+        * retrypolicy -- RetryPolicy for transient errors, 429 responses and
+            connection resets. See pingdomlib.retry for its settings
+                Type: RetryPolicy
+                Default: RetryPolicy()
+
+    Caching parameters:
+
+        * cache -- Cache for responses of GET calls whose data rarely
+            changes, such as probes(), references(), getSettings(),
+            getContacts() and check details. See pingdomlib.cache
+                Type: ResponseCache
+                Default: None
+
+    Decoding parameters:
+
+        * jsonbackend -- Library decoding response bodies: 'orjson',
+            'simdjson', 'ujson' or 'json'. See pingdomlib.jsonbackend
+                Type: String
+                Default: None (the fastest one installed)
+
+        * stream -- Decode check listings, results and alerts item by item
+            as they are read off the socket, see pingdomlib.jsonstream. This
+            bounds memory but always uses the stdlib decoder
+                Type: Boolean
+                Default: None (only when jsonbackend is 'json')
+
+    Instrumentation parameters:
+
+        * hooks -- Hooks called before and after every request attempt,
+            on retries and on errors, with the endpoint, status, bytes,
+            timings and rate limits. See pingdomlib.instrumentation for
+            RequestHook and the EndpointStats, PrometheusHook and
+            OpenTelemetryHook implementations. Connections are only timed
+            when hooks are given here
+                Type: List of RequestHook
+                Default: None
+
+    Instances can be used as a context manager, the pooled connections are
+        closed on exit. Call close() to release them otherwise.
     """
 
     def __init__(self, username, password, apikey, accountemail=None,
-                 pushchanges=True, server=server_address):
+                 pushchanges=True, server=server_address,
+                 pool_connections=10, pool_maxsize=10, pool_block=False,
+                 workers=8, compression=True, ratelimit=True, pace=False,
+                 retrypolicy=None, cache=None, jsonbackend=None,
+                 stream=None, hooks=None):
         self.pushChanges = pushchanges
         self.username = username
         self.password = password
@@ -32,6 +220,58 @@ class Pingdom(object):
         self.url = '%s/api/%s/' % (server, api_version)
         self.shortlimit = ''
         self.longlimit = ''
+        self.ratelimiter = RateLimiter(pace) if ratelimit else None
+        self.retrypolicy = retrypolicy or RetryPolicy()
+        self.workers = workers
+        self.cache = cache
+        self.jsonbackend, loads = loadBackend(jsonbackend)
+        self.stream = self.jsonbackend == 'json' if stream is None else stream
+        self.hooks = list(hooks or [])
+        self.bytesreceived = 0
+        self.bytesdecoded = 0
+        self.detailfetches = 0
+        self._detailwarned = False
+        self._pending = collections.OrderedDict()
+        self._statslock = threading.Lock()
+
+        # Auth and headers are constant per connection, set them up once
+        self.session = requests.Session()
+        self.session.auth = (self.username, self.password)
+        self.session.headers.update({'App-Key': self.apikey})
+        if self.accountemail:
+            self.session.headers.update({'Account-Email': self.accountemail})
+        if compression:
+            self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+        else:
+            self.session.headers['Accept-Encoding'] = 'identity'
+
+        adapter = JSONAdapter(loads, pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              pool_block=pool_block)
+        if self.hooks:
+            timeConnections(adapter)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Closes all pooled connections to pingdom"""
+
+        self.session.close()
+
+    def budget(self):
+        """Returns the remaining api rate limit budget, useful to plan large
+            numbers of calls. See RateLimiter.budget() for the returned
+            structure"""
+
+        if self.ratelimiter is None:
+            return {'short': None, 'long': None}
+        return self.ratelimiter.budget()
 
     @staticmethod
     def _serializeBooleans(params):
@@ -49,35 +289,114 @@ class Pingdom(object):
             if isinstance(v, bool):
                 params[k] = str(v).lower()
 
-    def request(self, method, url, parameters=dict()):
-        """Requests wrapper function"""
+    @staticmethod
+    def _actionsParameters(parameters):
+        """Warn user about parameters unhandled by actions()"""
+        for key in parameters:
+            if key not in ['from', 'to', 'limit', 'offset', 'checkids',
+                           'contactids', 'status', 'via']:
+                sys.stderr.write('%s not a valid argument for actions()\n'
+                                 % key)
+
+    @staticmethod
+    def _getChecksParameters(parameters):
+        """Warn user about parameters unhandled by getChecks()"""
+        for key in parameters:
+            if key not in ['limit', 'offset', 'tags']:
+                sys.stderr.write('%s not a valid argument for getChecks()\n'
+                                 % key)
+
+    def request(self, method, url, parameters=dict(), stream=False):
+        """Requests wrapper function
+
+        With stream the body of a successful response is left unread, to be
+            decoded as it arrives with _iterItems(). Ignored when streaming
+            is disabled or the cache keeps responses of url, cached
+            responses are read in full.
+        """
 
         # The requests library uses urllib, which serializes to "True"/"False" while Pingdom requires lowercase
         parameters = self._serializeBooleans(parameters)
 
-        headers = {'App-Key': self.apikey}
-        if self.accountemail:
-            headers.update({'Account-Email': self.accountemail})
+        if method.upper() not in ['GET', 'POST', 'PUT', 'DELETE']:
+            raise Exception("Invalid method in pingdom request")
+
+        stream = stream and self.stream and (self.cache is None or
+                                             self.cache.ttl(url) is None)
+        if self.cache is not None and method.upper() == 'GET':
+            response = self.cache.get(url, parameters)
+            if response is not None:
+                return response
+
+        attempt = 0
+        while True:
+            attempt += 1
+            event = self._newEvent(method, url, attempt)
+            try:
+                response = self._send(method, url, parameters, stream, event)
+            except retryable_errors as error:
+                if not self.retrypolicy.retryError(method, attempt, error):
+                    self._emit('error', event, error=error)
+                    raise
+                delay = self.retrypolicy.delay(attempt)
+                self._emit('retry', event, error=error, delay=delay)
+                time.sleep(delay)
+                continue
+            except Exception as error:
+                self._emit('error', event, error=error)
+                raise
+
+            if (response.status_code != 200 and
+                    self.retrypolicy.retryStatus(method, attempt,
+                                                 response.status_code)):
+                response.close()
+                delay = self.retrypolicy.delay(
+                    attempt, response.headers.get('Retry-After'))
+                self._emit('retry', event, delay=delay)
+                time.sleep(delay)
+                continue
+            break
+
+        if self.cache is not None and method.upper() != 'GET':
+            # Even a failed write may have changed something
+            self.cache.invalidate(url)
+
+        # Verify OK response
+        if response.status_code != 200:
+            sys.stderr.write('ERROR from %s: %d' % (response.url,
+                                                    response.status_code))
+            sys.stderr.write('Returned data: %s\n' % response.text)
+            try:
+                response.raise_for_status()
+            except Exception as error:
+                self._emit('error', event, error=error)
+                raise
+
+        self.retrypolicy.succeeded(attempt)
+        if self.cache is not None and method.upper() == 'GET':
+            self.cache.set(url, parameters, response)
+        return response
+
+    def _send(self, method, url, parameters, stream=False, event=None):
+        """Sends a single request to pingdom and records the api limits"""
+
+        queued = 0.0
+        if self.ratelimiter is not None:
+            queued = self.ratelimiter.acquire()
+
+        if event is not None:
+            event['queued'] = queued
+            event['start'] = time.time()
+            self._emit('preRequest', event)
+            startTimings()
 
         # Method selection handling
-        if method.upper() == 'GET':
-            response = requests.get(self.url + url, params=parameters,
-                                    auth=(self.username, self.password),
-                                    headers=headers)
-        elif method.upper() == 'POST':
-            response = requests.post(self.url + url, data=parameters,
-                                     auth=(self.username, self.password),
-                                     headers=headers)
-        elif method.upper() == 'PUT':
-            response = requests.put(self.url + url, data=parameters,
-                                    auth=(self.username, self.password),
-                                    headers=headers)
-        elif method.upper() == 'DELETE':
-            response = requests.delete(self.url + url, params=parameters,
-                                       auth=(self.username, self.password),
-                                       headers=headers)
+        if method.upper() in ['GET', 'DELETE']:
+            response = self.session.request(method.upper(), self.url + url,
+                                            params=parameters, stream=stream)
         else:
-            raise Exception("Invalid method in pingdom request")
+            response = self.session.request(method.upper(), self.url + url,
+                                            data=parameters)
 
         # Store pingdom api limits
         self.shortlimit = response.headers.get(
@@ -86,16 +405,100 @@ class Pingdom(object):
         self.longlimit = response.headers.get(
             'Req-Limit-Long',
             self.longlimit)
-
-        # Verify OK response
-        if response.status_code != 200:
-            sys.stderr.write('ERROR from %s: %d' % (response.url,
-                                                    response.status_code))
-            sys.stderr.write('Returned data: %s\n' % response.json())
-            response.raise_for_status()
+        if self.ratelimiter is not None:
+            self.ratelimiter.update(response.headers)
+
+        # Body was read and decompressed chunk by chunk, count both sizes.
+        # Streamed bodies are counted by _iterItems() once read
+        response.streamed = stream
+        response.event = event
+        if event is not None:
+            event['status'] = response.status_code
+            event['shortlimit'] = RateLimit.parse(
+                response.headers.get('Req-Limit-Short'))
+            event['longlimit'] = RateLimit.parse(
+                response.headers.get('Req-Limit-Long'))
+            event['timings'] = stopTimings()
+            event['elapsed'] = response.elapsed.total_seconds()
+        if not stream:
+            self._countBytes(response, len(response.content))
+        elif response.status_code != 200:
+            self._emit('postResponse', event,
+                       timings=requestTimings(event['timings'],
+                                              event['elapsed'], None)
+                       if event else None)
 
         return response
 
+    def _countBytes(self, response, decoded):
+        """Counts the bytes of a body once read, and reports the response
+            to the hooks"""
+
+        received = response.raw.tell()
+        with self._statslock:
+            self.bytesreceived += received
+            self.bytesdecoded += decoded
+
+        event = response.event
+        if event is not None:
+            self._emit('postResponse', event, bytes=received, decoded=decoded,
+                       timings=requestTimings(event['timings'],
+                                              event['elapsed'],
+                                              time.time() - event['start']))
+
+    def _newEvent(self, method, url, attempt):
+        """Returns the event dictionary passed to the hooks for a request
+            attempt, None without hooks. See RequestHook"""
+
+        if not self.hooks:
+            return None
+        return {'method': method.upper(), 'endpoint': url.split('/', 1)[0],
+                'url': url, 'attempt': attempt, 'start': time.time(),
+                'queued': 0.0, 'status': None, 'bytes': None,
+                'decoded': None, 'timings': {}, 'shortlimit': None,
+                'longlimit': None, 'error': None, 'delay': None}
+
+    def _emit(self, name, event, **fields):
+        """Updates an event and calls the name method of every hook"""
+
+        if event is None:
+            return
+        event.update(fields)
+        for hook in self.hooks:
+            try:
+                getattr(hook, name)(event)
+            except Exception as error:
+                sys.stderr.write('%s hook of %r failed: %r\n' % (name, hook,
+                                                                   error))
+
+    def _iterItems(self, response, path):
+        """Generator over the items of the array at path in the body of a
+            response, see pingdomlib.jsonstream. Streamed bodies are decoded
+            as they are read off the socket, holding a single item at once.
+            Others are decoded whole with the JSON backend"""
+
+        if not response.streamed:
+            data = response.json()
+            for key in path:
+                data = data.get(key) if isinstance(data, dict) else None
+            for item in data or []:
+                yield item
+            return
+
+        decoded = [0]
+
+        def chunks():
+            for chunk in response.iter_content(stream_chunk_size):
+                decoded[0] += len(chunk)
+                yield chunk
+
+        try:
+            for item in iterItems(chunks(), path):
+                yield item
+        finally:
+            self._countBytes(response, decoded[0])
+            response.close()
+
     def actions(self, **parameters):
         """Returns a list of actions (alerts) that have been generated for
             your account.
@@ -171,12 +574,7 @@ class Pingdom(object):
         }
         """
 
-        # Warn user about unhandled parameters
-        for key in parameters:
-            if key not in ['from', 'to', 'limit', 'offset', 'checkids',
-                           'contactids', 'status', 'via']:
-                sys.stderr.write('%s not a valid argument for actions()\n'
-                                 % key)
+        self._actionsParameters(parameters)
 
         response = self.request('GET', 'actions', parameters)
 
@@ -188,7 +586,55 @@ class Pingdom(object):
 
         return self.actions(**parameters)['alerts']
 
-    def getChecks(self, **parameters):
+    def iterAlerts(self, maxalerts=None, stop=None, **parameters):
+        """Generator over all alerts matching parameters, pages through
+            actions() 300 alerts at a time. Alerts are yielded as they are
+            decoded off the socket, pages are never held in full.
+
+        Optional Parameters:
+
+            * maxalerts -- Stop after yielding this many alerts
+                    Type: Integer
+                    Default: None
+
+            * stop -- Function called with each alert, iteration stops
+                before the first alert it returns True for
+                    Type: Callable
+                    Default: None
+
+        Accepts the filters of actions() (from, to, checkids, contactids,
+            status, via). Yields alert dictionaries as described in
+            actions().
+        """
+
+        for key in ['limit', 'offset']:
+            if key in parameters:
+                sys.stderr.write('%s is managed by iterAlerts()\n' % key)
+                del parameters[key]
+
+        self._actionsParameters(parameters)
+
+        yielded = 0
+        offset = 0
+        while True:
+            parameters['limit'] = actions_page_size
+            parameters['offset'] = offset
+            response = self.request('GET', 'actions', parameters, stream=True)
+            count = 0
+            for alert in self._iterItems(response, ('actions', 'alerts')):
+                count += 1
+                if maxalerts is not None and yielded >= maxalerts:
+                    return
+                if stop is not None and stop(alert):
+                    return
+                yield alert
+                yielded += 1
+
+            if count < actions_page_size:
+                return
+            offset += actions_page_size
+
+    def getChecks(self, details=False, lightweight=False, **parameters):
         """Pulls all checks from pingdom
 
         Optional Parameters:
@@ -206,17 +652,32 @@ class Pingdom(object):
                     Type: String
                     Default: None
 
+            * details -- Also fetch the full details of every check, in
+                parallel. See hydrate()
+                    Type: Boolean
+                    Default: False
+
+            * lightweight -- Return compact, read-only PingdomCheckRecord
+                instances instead of PingdomCheck instances
+                    Type: Boolean
+                    Default: False
+
         """
 
-        # Warn user about unhandled parameters
-        for key in parameters:
-            if key not in ['limit', 'offset', 'tags']:
-                sys.stderr.write('%s not a valid argument for getChecks()\n'
-                                 % key)
+        self._getChecksParameters(parameters)
 
-        response = self.request('GET', 'checks', parameters)
+        # Checks are built as the listing is decoded, the parsed listing is
+        # never held in full
+        response = self.request('GET', 'checks', parameters, stream=True)
+        listing = self._iterItems(response, ('checks',))
 
-        return [PingdomCheck(self, x) for x in response.json()['checks']]
+        if lightweight:
+            return [PingdomCheckRecord(x) for x in listing]
+
+        checks = [PingdomCheck(self, x) for x in listing]
+        if details:
+            self.hydrate(checks)
+        return checks
 
     def getCheck(self, checkid):
         """Returns a detailed description of a specified check."""
@@ -225,6 +686,190 @@ class Pingdom(object):
         check.getDetails()
         return check
 
+    def hydrate(self, checks, workers=None):
+        """Fetches the full details of many checks in parallel, instead of
+            one request after another. Returns the list of checks
+
+        The check listing leaves out details such as the alert settings,
+            which are None until getDetails() is called for each check.
+
+        Optional Parameters:
+
+            * workers -- Number of details fetched at the same time
+                    Type: Integer
+                    Default: Pingdom workers setting
+        """
+
+        checks = list(checks)
+        list(workerMap(lambda check: check._loadDetails(), checks,
+                       workers or self.workers))
+        self.detailfetches = 0
+        return checks
+
+    def collectSummaries(self, checks=None,
+                         summaries=('averages', 'outages', 'performance'),
+                         workers=None, **kwargs):
+        """Generator fetching summaries of many checks in parallel, yielding
+            them as they complete.
+
+        Calls are spread over the workers and paced by the rate limiter. A
+            failed call does not stop the run, its exception is yielded in
+            place of the summary.
+
+        Optional Parameters:
+
+            * checks -- Checks to summarize
+                    Type: Iterable of PingdomCheck
+                    Default: All checks, see getChecks()
+
+            * summaries -- Names of the PingdomCheck summary methods to call
+                for each check ('averages', 'hoursofday', 'outages',
+                'performance', 'results'), or a dictionary of extra
+                parameters per name
+                    Type: Tuple or Dictionary
+                    Default: ('averages', 'outages', 'performance')
+
+            * workers -- Number of calls made at the same time
+                    Type: Integer
+                    Default: Pingdom workers setting
+
+        Other parameters, such as time_from and time_to, are passed to every
+            summary method.
+
+        Yields (<PingdomCheck>, <String> summary name, <summary or
+            exception>) tuples, see the summary methods for their structures.
+
+        Example:
+
+            for check, name, summary in api.collectSummaries(
+                    time_from=start, time_to=end):
+                if isinstance(summary, Exception):
+                    failures.append((check, name, summary))
+        """
+
+        # Blocking versions, getChecks() and the summary calls are
+        # coroutines on AsyncPingdom
+        if checks is None:
+            checks = Pingdom.getChecks(self)
+        if not isinstance(summaries, dict):
+            summaries = dict((name, {}) for name in summaries)
+
+        def calls():
+            for check in checks:
+                for name, parameters in summaries.items():
+                    yield check, name, parameters
+
+        def call(item):
+            check, name, parameters = item
+            arguments = dict(kwargs)
+            arguments.update(parameters)
+            return getattr(PingdomCheck, name)(check, **arguments)
+
+        for item, result in workerMap(call, calls(), workers or self.workers,
+                                      ordered=False, errors=True):
+            yield item[0], item[1], result
+
+    def _countDetailFetch(self):
+        """Counts details fetched for a single check, warns once when it
+            looks like they are fetched in a loop"""
+
+        with self._statslock:
+            self.detailfetches += 1
+            if (self.detailfetches == detail_fetch_warning and
+                    not self._detailwarned):
+                self._detailwarned = True
+                sys.stderr.write('Details of %d checks were fetched one at a '
+                                 'time, use Pingdom.hydrate() or '
+                                 'getChecks(details=True) to fetch them in '
+                                 'parallel\n' % self.detailfetches)
+
+    def flush(self, workers=None):
+        """Pushes the changes made to checks, contacts and email reports
+            while pushChanges was disabled.
+
+        Checks that only changed paused and/or resolution to the same values
+            are grouped into one modifyChecks() call, contacts pausing or
+            unpausing into one modifyContacts() call. Other objects are
+            modified in parallel. Objects whose push failed keep their
+            pending changes.
+
+        Optional Parameters:
+
+            * workers -- Number of modify() calls sent at the same time
+                    Type: Integer
+                    Default: Pingdom workers setting
+
+        Returned structure:
+        [
+            (
+                <List> Objects pushed by the request,
+                <String> Status message, or the exception raised
+            ),
+            ...
+        ]
+        """
+
+        with self._statslock:
+            pending = list(self._pending.values())
+
+        checkgroups = collections.OrderedDict()
+        contactgroups = collections.OrderedDict()
+        calls = []
+        for item in pending:
+            changes = item.pendingChanges()
+            if not changes:
+                continue
+            if (isinstance(item, PingdomCheck) and
+                    set(changes) <= set(['paused', 'resolution'])):
+                group = tuple(sorted(changes.items()))
+                checkgroups.setdefault(group, []).append(item)
+            elif isinstance(item, PingdomContact) and 'paused' in changes:
+                # Contact modify() can't pause, always use the bulk call
+                paused = changes.pop('paused')
+                contactgroups.setdefault(paused, []).append(item)
+                if changes:
+                    calls.append(([item], [changes], functools.partial(
+                        item.modify, **changes)))
+            else:
+                calls.append(([item], [changes], functools.partial(
+                    item.modify, **changes)))
+
+        # One call per chunk, so only the objects of failed chunks keep
+        # their changes
+        def chunks(groups):
+            for group, items in groups.items():
+                for chunk in self._bulkChunks(items,
+                                              lambda item: str(item.id)):
+                    yield group, chunk, ','.join([str(item.id)
+                                                  for item in chunk])
+
+        for group, items, ids in chunks(checkgroups):
+            calls.append((items, [dict(group)] * len(items),
+                          functools.partial(self.modifyChecks, checkids=ids,
+                                            **dict(group))))
+        for paused, items, ids in chunks(contactgroups):
+            calls.append((items, [{'paused': paused}] * len(items),
+                          functools.partial(self.modifyContacts, ids,
+                                            paused)))
+
+        def push(call):
+            items, changes, send = call
+            result = send()
+            for item, pushed in zip(items, changes):
+                item._clearChanges(pushed)
+            return result
+
+        return [(call[0], result) for call, result in
+                workerMap(push, calls, workers or self.workers, errors=True)]
+
+    def _queueChanges(self, item):
+        with self._statslock:
+            self._pending[id(item)] = item
+
+    def _dequeueChanges(self, item):
+        with self._statslock:
+            self._pending.pop(id(item), None)
+
     def getResults(self, checkid):
         """ Returns detailed results for a specified check id."""
         response = self.request('GET','results/%s' % checkid)
@@ -452,133 +1097,119 @@ class Pingdom(object):
                     Default: False
         """
 
-        if checktype == 'http':
-            # Warn user about unhandled parameters
-            for key in kwargs:
-                if key not in ['alert_policy', 'autoresolve', 'paused', 'resolution', 'contactids',
-                               'sendtoemail', 'sendtosms', 'sendtotwitter',
-                               'sendtoiphone', 'sendtoandroid',
-                               'sendnotificationwhendown', 'notifyagainevery',
-                               'notifywhenbackup', 'type', 'hostname', 'url',
-                               'encryption', 'port', 'auth', 'shouldcontain',
-                               'shouldnotcontain', 'postdata',
-                               'use_legacy_notifications']:
-                    if key.startswith('requestheader') is not True:
-                        sys.stderr.write("'%s'" % key + ' is not a valid ' +
-                                         'argument of newCheck() for type ' +
-                                         "'http'\n")
-        elif checktype == 'httpcustom':
-            # Warn user about unhandled parameters
-            for key in kwargs:
-                if key not in ['paused', 'resolution', 'contactids',
-                               'sendtoemail', 'sendtosms', 'sendtotwitter',
-                               'sendtoiphone', 'sendtoandroid',
-                               'sendnotificationwhendown', 'notifyagainevery',
-                               'notifywhenbackup', 'type', 'hostname', 'url',
-                               'encryption', 'port', 'auth', 'additionalurls',
-                               'use_legacy_notifications']:
-                    sys.stderr.write("'%s'" % key + ' is not a valid ' +
-                                     'argument of newCheck() for type ' +
-                                     "'httpcustom'\n")
-        elif checktype == 'tcp':
-            # Warn user about unhandled parameters
-            for key in kwargs:
-                if key not in ['alert_policy', 'autoresolve', 'paused', 'resolution', 'contactids',
-                               'sendtoemail', 'sendtosms', 'sendtotwitter',
-                               'sendtoiphone', 'sendtoandroid',
-                               'sendnotificationwhendown', 'notifyagainevery',
-                               'notifywhenbackup', 'type', 'hostname', 'port',
-                               'stringtosend', 'stringtoexpect',
-                               'use_legacy_notifications']:
-                    sys.stderr.write("'%s'" % key + ' is not a valid ' +
-                                     'argument of newCheck() for type ' +
-                                     "'tcp'\n")
-        elif checktype == 'ping':
-            # Warn user about unhandled parameters
-            for key in kwargs:
-                if key not in ['paused', 'resolution', 'contactids',
-                               'sendtoemail', 'sendtosms', 'sendtotwitter',
-                               'sendtoiphone', 'sendtoandroid',
-                               'sendnotificationwhendown', 'notifyagainevery',
-                               'notifywhenbackup', 'type', 'hostname',
-                               'use_legacy_notifications']:
-                    sys.stderr.write("'%s'" % key + ' is not a valid ' +
-                                     'argument of newCheck() for type ' +
-                                     "'ping'\n")
-        elif checktype == 'dns':
-            # Warn user about unhandled parameters
-            for key in kwargs:
-                if key not in ['paused', 'resolution', 'contactids',
-                               'sendtoemail', 'sendtosms', 'sendtotwitter',
-                               'sendtoiphone', 'sendtoandroid',
-                               'sendnotificationwhendown', 'notifyagainevery',
-                               'notifywhenbackup', 'type', 'hostname',
-                               'expectedip', 'nameserver',
-                               'use_legacy_notifications']:
-                    sys.stderr.write("'%s'" % key + ' is not a valid ' +
-                                     'argument of newCheck() for type ' +
-                                     "'dns'\n")
-        elif checktype == 'udp':
-            # Warn user about unhandled parameters
-            for key in kwargs:
-                if key not in ['paused', 'resolution', 'contactids',
-                               'sendtoemail', 'sendtosms', 'sendtotwitter',
-                               'sendtoiphone', 'sendtoandroid',
-                               'sendnotificationwhendown', 'notifyagainevery',
-                               'notifywhenbackup', 'type', 'hostname', 'port',
-                               'stringtosend', 'stringtoexpect',
-                               'use_legacy_notifications']:
-                    sys.stderr.write("'%s'" % key + ' is not a valid ' +
-                                     'argument of newCheck() for type ' +
-                                     "'udp'\n")
-        elif checktype == 'smtp':
-            # Warn user about unhandled parameters
-            for key in kwargs:
-                if key not in ['paused', 'resolution', 'contactids',
-                               'sendtoemail', 'sendtosms', 'sendtotwitter',
-                               'sendtoiphone', 'sendtoandroid',
-                               'sendnotificationwhendown', 'notifyagainevery',
-                               'notifywhenbackup', 'type', 'hostname', 'port',
-                               'auth', 'stringtoexpect', 'encryption',
-                               'use_legacy_notifications']:
-                    sys.stderr.write("'%s'" % key + ' is not a valid ' +
-                                     'argument of newCheck() for type ' +
-                                     "'smtp'\n")
-        elif checktype == 'pop3':
-            # Warn user about unhandled parameters
-            for key in kwargs:
-                if key not in ['paused', 'resolution', 'contactids',
-                               'sendtoemail', 'sendtosms', 'sendtotwitter',
-                               'sendtoiphone', 'sendtoandroid',
-                               'sendnotificationwhendown', 'notifyagainevery',
-                               'notifywhenbackup', 'type', 'hostname', 'port',
-                               'stringtoexpect', 'encryption',
-                               'use_legacy_notifications']:
-                    sys.stderr.write("'%s'" % key + ' is not a valid ' +
-                                     'argument of newCheck() for type ' +
-                                     "'pop3'\n")
-        elif checktype == 'imap':
-            # Warn user about unhandled parameters
-            for key in kwargs:
-                if key not in ['paused', 'resolution', 'contactids',
-                               'sendtoemail', 'sendtosms', 'sendtotwitter',
-                               'sendtoiphone', 'sendtoandroid',
-                               'sendnotificationwhendown', 'notifyagainevery',
-                               'notifywhenbackup', 'type', 'hostname', 'port',
-                               'stringtoexpect', 'encryption',
-                               'use_legacy_notifications']:
-                    sys.stderr.write("'%s'" % key + ' is not a valid ' +
-                                     'argument of newCheck() for type ' +
-                                     "'imap'\n")
-        else:
+        parameters = self._newCheckParameters(name, host, checktype, kwargs)
+
+        checkinfo = self.request("POST", 'checks', parameters)
+        # getCheck() is a coroutine on AsyncPingdom
+        return Pingdom.getCheck(self, checkinfo.json()['check']['id'])
+
+    @staticmethod
+    def _newCheckParameters(name, host, checktype, kwargs):
+        """Checks newCheck() arguments, returns the parameters to send"""
+
+        if checktype not in newcheck_parameters:
             raise Exception("Invalid checktype in newCheck()")
 
+        # Warn user about unhandled parameters
+        for key in kwargs:
+            if key not in newcheck_parameters[checktype]:
+                if checktype == 'http' and key.startswith('requestheader'):
+                    continue
+                sys.stderr.write("'%s'" % key + ' is not a valid ' +
+                                 'argument of newCheck() for type ' +
+                                 "'%s'\n" % checktype)
+
         parameters = {'name': name, 'host': host, 'type': checktype}
-        for key, value in kwargs.iteritems():
-            parameters[key] = value
+        parameters.update(kwargs)
+        return parameters
 
-        checkinfo = self.request("POST", 'checks', parameters)
-        return self.getCheck(checkinfo.json()['check']['id'])
+    def newChecks(self, specs, details=True, workers=None):
+        """Creates many checks in parallel.
+
+        Every spec is a dictionary holding the name, host and type of a check
+            along with any optional parameters of newCheck(). All specs are
+            checked before any check is created, a spec that fails doesn't
+            stop the others.
+
+        Optional Parameters:
+
+            * details -- Fetch the details of every new check, as newCheck()
+                does. Without them checks only hold the settings sent
+                    Type: Boolean
+                    Default: True
+
+            * workers -- Number of checks created at the same time
+                    Type: Integer
+                    Default: Pingdom workers setting
+
+        Returns a list with, for every spec in order, the new PingdomCheck
+            or the exception raised while creating it.
+        """
+
+        results = []
+        pending = []
+        for spec in specs:
+            spec = dict(spec)
+            try:
+                name = spec.pop('name')
+                host = spec.pop('host')
+                checktype = spec.pop('type', 'http')
+                parameters = self._newCheckParameters(name, host, checktype,
+                                                      spec)
+            except KeyError as error:
+                results.append(Exception('Check spec is missing %s' % error))
+            except Exception as error:
+                results.append(error)
+            else:
+                results.append(None)
+                pending.append((len(results) - 1, parameters))
+
+        def create(item):
+            parameters = item[1]
+            checkinfo = self.request("POST", 'checks', parameters).json()
+            checkinfo = checkinfo['check']
+            check = PingdomCheck(self, {'id': checkinfo['id']})
+            if details:
+                check._loadDetails()
+            else:
+                settings = dict(parameters, hostname=parameters['host'])
+                del settings['host']
+                settings.update(checkinfo)
+                # paused is derived from status by __addDetails__
+                if settings.get('paused') in [True, 'true']:
+                    settings['status'] = 'paused'
+                check.__addDetails__(settings)
+            return check
+
+        for item, check in workerMap(create, pending, workers or self.workers,
+                                     errors=True):
+            results[item[0]] = check
+
+        return results
+
+    def reconcile(self, desired, dryrun=False, **kwargs):
+        """Creates, updates and deletes checks so they match the desired
+            specs, with as few calls as possible. Returns the ReconcilePlan,
+            print it to see the changes.
+
+        Parameters:
+
+            * desired -- Specs as accepted by newChecks()
+                    Type: Iterable of dictionaries
+
+            * dryrun -- Only compute the plan, don't change anything
+                    Type: Boolean
+                    Default: False
+
+        Accepts the key, tags, delete and workers parameters of
+            pingdomlib.reconcile.CheckReconciler.
+        """
+
+        reconciler = CheckReconciler(self, **kwargs)
+        plan = reconciler.plan(desired)
+        if not dryrun:
+            reconciler.apply(plan)
+        return plan
 
     def modifyChecks(self, **kwargs):
         """Pause or change resolution for multiple checks in one bulk call.
@@ -594,6 +1225,13 @@ class Pingdom(object):
             * checkids -- Comma-separated list of identifiers for checks to be
                 modified. Invalid check identifiers will be ignored.
                     Type: String
+
+        Identifiers can also be given as a list or any iterable. Long lists,
+            given either way, are split into chunks that fit in a URL and
+            sent in parallel. The status messages of the chunks are returned
+            one per line. When any chunk fails BulkCallError is raised once
+            every chunk was sent, see its results for the chunks that
+            succeeded.
         """
 
         # Warn user about unhandled parameters
@@ -602,16 +1240,85 @@ class Pingdom(object):
                 sys.stderr.write("'%s'" % key + ' is not a valid argument ' +
                                  'of newCheck()\n')
 
-        return self.request("PUT", "checks", kwargs).json()['message']
+        if 'checkids' not in kwargs:
+            return self.request("PUT", "checks", kwargs).json()['message']
+
+        def modify(checkids):
+            parameters = dict(kwargs, checkids=checkids)
+            return self.request("PUT", "checks", parameters).json()['message']
+
+        return self._bulkCall(modify, kwargs['checkids'])
 
     def deleteChecks(self, checkids):
         """Deletes a list of checks, CANNOT BE REVERSED!
 
         Provide a comma-separated list of checkid's to delete
+
+        Identifiers can also be given as a list or any iterable. Long lists,
+            given either way, are split into chunks that fit in a URL and
+            sent in parallel. The status messages of the chunks are returned
+            one per line. When any chunk fails BulkCallError is raised once
+            every chunk was sent, see its results for the chunks that
+            succeeded.
+        """
+
+        return self._bulkCall(
+            lambda ids: self.request("DELETE", "checks",
+                                     {'delcheckids': ids}).json()['message'],
+            checkids)
+
+    def _bulkCall(self, send, ids, workers=None):
+        """Calls send with comma-separated chunks of ids, see bulk_ids_length.
+
+        ids is a comma-separated string or an iterable. Returns the distinct
+            results of send joined by newlines, None without ids as an empty
+            bulk call would apply to every check. Raises BulkCallError after
+            every chunk was sent when any of them failed
         """
 
-        return self.request("DELETE", "checks",
-                            {'delcheckids': checkids}).json()['message']
+        if isinstance(ids, bytes) and not isinstance(ids, string_types):
+            ids = ids.decode('ascii')
+        if isinstance(ids, string_types):
+            ids = ids.split(',')
+        chunks = [','.join(chunk) for chunk in
+                  self._bulkChunks(str(identifier).strip()
+                                   for identifier in ids
+                                   if str(identifier).strip())]
+        if not chunks:
+            return None
+
+        results = list(workerMap(send, chunks, workers or self.workers,
+                                 errors=True))
+        errors = [result for chunk, result in results
+                  if isinstance(result, Exception)]
+        if errors:
+            raise BulkCallError(results, errors)
+        messages = []
+        for chunk, message in results:
+            if message not in messages:
+                messages.append(message)
+        return '\n'.join(messages)
+
+    @staticmethod
+    def _bulkChunks(items, key=str):
+        """Splits items into lists whose comma-separated key(item) strings
+            fit in bulk_ids_length"""
+
+        chunks = []
+        chunk = []
+        length = 0
+        for item in items:
+            identifier = key(item)
+            # Commas are escaped to %2C in query strings
+            if chunk and length + len(identifier) + 3 > bulk_ids_length:
+                chunks.append(chunk)
+                chunk = []
+                length = 0
+            chunk.append(item)
+            length += len(identifier) + 3
+        if chunk:
+            chunks.append(chunk)
+        return chunks
 
     def credits(self):
         """Gets credits list"""
@@ -848,23 +1555,41 @@ class Pingdom(object):
 
         Provide comma separated list of contact ids and desired paused state
 
+        Identifiers can also be given as a list or any iterable. Long lists,
+            given either way, are split into chunks that fit in a URL and
+            sent in parallel. The status messages of the chunks are returned
+            one per line. When any chunk fails BulkCallError is raised once
+            every chunk was sent, see its results for the chunks that
+            succeeded.
+
         Returns status message
         """
 
-        response = self.request("PUT", "notification_contacts", {'contactids': contactids,
-                                                    'paused': paused})
-        return response.json()['message']
+        return self._bulkCall(
+            lambda ids: self.request("PUT", "notification_contacts",
+                                     {'contactids': ids,
+                                      'paused': paused}).json()['message'],
+            contactids)
 
     def deleteContacts(self, contactids):
         """Deletes a list of contacts. CANNOT BE REVERSED!
 
         Provide a comma-separated list of contactid's to delete
 
+        Identifiers can also be given as a list or any iterable. Long lists,
+            given either way, are split into chunks that fit in a URL and
+            sent in parallel. The status messages of the chunks are returned
+            one per line. When any chunk fails BulkCallError is raised once
+            every chunk was sent, see its results for the chunks that
+            succeeded.
+
         Returns status message
         """
 
-        return self.request("DELETE", "notification_contacts",
-                            {'delcheckids': contactids}).json()['message']
+        return self._bulkCall(
+            lambda ids: self.request("DELETE", "notification_contacts",
+                                     {'delcheckids': ids}).json()['message'],
+            contactids)
 
     def singleTest(self, host, checktype, **kwargs):
         """Performs a single test using a specified Pingdom probe against a
@@ -0,0 +1,153 @@
+import re
+import threading
+import time
+
+# Req-Limit-Short: Remaining: 394 Time until reset: 3589
+limit_pattern = re.compile(r'Remaining:\s*(\d+)\s*Time until reset:\s*(\d+)')
+
+# Seconds added to the reset time, pingdom rounds the time until reset down
+reset_margin = 1
+
+
+class RateLimit(object):
+    """Class representing one of the pingdom api rate limits
+
+    Attributes:
+
+        * remaining -- Requests left before the limit is reached
+        * reset -- Seconds until the limit resets, as received
+        * resettime -- Time the limit resets, plus reset_margin. Format is
+            UNIX timestamp
+    """
+
+    def __init__(self, remaining, reset, received=None):
+        if received is None:
+            received = time.time()
+        self.remaining = remaining
+        self.reset = reset
+        self.resettime = received + reset + reset_margin
+
+    def __str__(self):
+        return 'Remaining: %d Time until reset: %d' % (self.remaining,
+                                                       self.reset)
+
+    @classmethod
+    def parse(cls, header, received=None):
+        """Returns a RateLimit from a Req-Limit-Short or Req-Limit-Long header
+            value, None if it can't be parsed"""
+
+        match = limit_pattern.search(header or '')
+        if not match:
+            return None
+        return cls(int(match.group(1)), int(match.group(2)), received)
+
+
+class RateLimiter(object):
+    """Schedules requests within the short and long pingdom api limits
+
+    The limits reported in the response headers are used as token buckets.
+    Every request takes a token from both, once a bucket is empty requests
+    wait for its reset. With pacing enabled the remaining tokens are spread
+    evenly over the time left until reset instead of being spent in bursts.
+
+    Safe to share between threads.
+    """
+
+    def __init__(self, pace=False):
+        self.pace = pace
+        self.limits = {'short': None, 'long': None}
+        self.waited = 0.0
+        self._last = {'short': 0.0, 'long': 0.0}
+        # Requests sent while a bucket was unknown, not counted in it yet
+        self._blind = {'short': 0, 'long': 0}
+        self._lock = threading.Lock()
+
+    def update(self, headers):
+        """Updates the buckets from the headers of a pingdom response"""
+
+        now = time.time()
+        with self._lock:
+            for name, header in [('short', 'Req-Limit-Short'),
+                                 ('long', 'Req-Limit-Long')]:
+                limit = RateLimit.parse(headers.get(header), now)
+                if limit is None:
+                    continue
+                current = self.limits[name]
+                # Responses can arrive out of order, only trust a higher
+                # remaining count once the known window is over
+                if current is not None and now < current.resettime:
+                    current.remaining = min(current.remaining,
+                                            limit.remaining)
+                else:
+                    # Requests sent before this response was received are
+                    # missing from its count, the first is this one
+                    limit.remaining -= max(self._blind[name] - 1, 0)
+                    self._blind[name] = 0
+                    self.limits[name] = limit
+
+    def acquire(self):
+        """Takes a token for one request, blocking until one is available.
+            Returns the number of seconds waited"""
+
+        with self._lock:
+            now = time.time()
+            start = now
+            for name, limit in self.limits.items():
+                if limit is None:
+                    continue
+                if now >= limit.resettime:
+                    # Window is over, the next response tells the new budget
+                    self.limits[name] = None
+                    continue
+                if limit.remaining <= 0:
+                    start = max(start, limit.resettime)
+                elif self.pace:
+                    interval = (limit.resettime - now) / limit.remaining
+                    start = max(start, self._last[name] + interval)
+
+            # Empty buckets stay in place until they reset, so every thread
+            # arriving meanwhile waits for the reset as well
+            for name, limit in self.limits.items():
+                if limit is None or start >= limit.resettime:
+                    self._blind[name] += 1
+                if limit is not None:
+                    limit.remaining -= 1
+                    self._last[name] = start
+
+        wait = start - now
+        if wait > 0:
+            time.sleep(wait)
+            with self._lock:
+                self.waited += wait
+        return max(wait, 0)
+
+    def budget(self):
+        """Returns the known remaining budget
+
+        Returned structure:
+        {
+            'short' :
+            {
+                'remaining' : <Integer> Requests left in this window
+                'reset'     : <Integer> Seconds until the window resets
+                'resettime' : <Integer> Time the window resets. Format is
+                               UNIX timestamp
+            },
+            'long' : < Same structure as short >
+        }
+
+        Limits not reported by pingdom yet, or whose window has passed, are
+        None.
+        """
+
+        now = time.time()
+        budget = {}
+        with self._lock:
+            for name, limit in self.limits.items():
+                if limit is None or now >= limit.resettime:
+                    budget[name] = None
+                else:
+                    budget[name] = {'remaining': max(limit.remaining, 0),
+                                    'reset': int(limit.resettime - now),
+                                    'resettime': int(limit.resettime)}
+        return budget
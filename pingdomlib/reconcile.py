@@ -0,0 +1,288 @@
+import collections
+import functools
+import sys
+
+from pingdomlib.workers import workerMap
+
+# Attributes filled in by the check listing, other settings need details
+listing_keys = set(['name', 'hostname', 'host', 'resolution', 'paused',
+                    'type'])
+
+# Settings modifyChecks() can change for many checks in one call
+bulk_keys = set(['paused', 'resolution'])
+
+
+def _same(live, desired):
+    """Compares a live value with a desired one, pingdom returns booleans
+        and numbers where specs may hold their string forms"""
+
+    if live == desired:
+        return True
+    if isinstance(desired, (list, tuple)):
+        desired = ','.join([str(x) for x in desired])
+    if isinstance(live, (list, tuple)):
+        live = ','.join([str(x) for x in live])
+    return str(live).lower() == str(desired).lower()
+
+
+def _liveValue(check, key):
+    """Returns the current value of a check setting, looking into the type
+        specific settings (check.http, check.tcp, ...) as well"""
+
+    if key == 'host':
+        key = 'hostname'
+    value = check.__dict__.get(key)
+    if value is None:
+        typesettings = check.__dict__.get(check.type)
+        if isinstance(typesettings, dict):
+            value = typesettings.get(key)
+    return value
+
+
+class ReconcilePlan(object):
+    """Changes needed to make the live checks match the desired ones
+
+    Attributes:
+
+        * creates -- List of specs to create
+        * updates -- List of (PingdomCheck, changes dictionary) tuples
+        * deletes -- List of PingdomCheck instances to delete
+        * replaces -- List of (PingdomCheck, spec) tuples whose type
+            changed, the check is in deletes and the spec in creates
+        * conflicts -- List of (PingdomCheck, spec) tuples whose type
+            differs, they can only be replaced when deleting is allowed
+        * unchanged -- Number of checks already matching their spec
+        * results -- Results of apply(), None until then
+
+    str() of a plan lists the changes, for dry runs.
+    """
+
+    def __init__(self):
+        self.creates = []
+        self.updates = []
+        self.deletes = []
+        self.replaces = []
+        self.conflicts = []
+        self.unchanged = 0
+        self.results = None
+
+    def __len__(self):
+        return len(self.creates) + len(self.updates) + len(self.deletes)
+
+    def __str__(self):
+        lines = []
+        for spec in self.creates:
+            lines.append('+ %s (%s %s)' % (spec['name'],
+                                           spec.get('type', 'http'),
+                                           spec['host']))
+        for check, changes in self.updates:
+            lines.append('~ %s (%s)' % (check.name, check.id))
+            for key in sorted(changes):
+                lines.append('    %s: %r -> %r' % (key,
+                                                   _liveValue(check, key),
+                                                   changes[key]))
+        for check in self.deletes:
+            lines.append('- %s (%s)' % (check.name, check.id))
+        for check, spec in self.conflicts:
+            lines.append('! %s (%s) is %s, wanted %s' % (
+                check.name, check.id, check.type, spec.get('type', 'http')))
+        lines.append('%d to create, %d to update, %d to delete, '
+                     '%d unchanged' % (len(self.creates), len(self.updates),
+                                       len(self.deletes), self.unchanged))
+        return '\n'.join(lines)
+
+
+class CheckReconciler(object):
+    """Computes and applies the changes turning the live checks into a
+        desired set of check specs
+
+    Specs are dictionaries as accepted by Pingdom.newChecks(): a name, host
+    and type along with any optional newCheck() parameters. Live checks are
+    matched to specs by an index on key.
+
+    Parameters:
+
+        * pingdom -- Pingdom instance
+                Type: Pingdom
+
+        * key -- What identifies a check: 'name', 'host', a tuple of both,
+            or a function called with a spec or a PingdomCheck
+                Type: String, Tuple or Callable
+                Default: 'name'
+
+        * tags -- Only manage checks having these tags. Others are neither
+            matched nor deleted
+                Type: String
+                Default: None (all checks)
+
+        * delete -- Delete managed checks without a spec, and replace checks
+            whose type changed
+                Type: Boolean
+                Default: False
+
+        * workers -- Number of requests sent at the same time
+                Type: Integer
+                Default: Pingdom workers setting
+    """
+
+    def __init__(self, pingdom, key='name', tags=None, delete=False,
+                 workers=None):
+        self.pingdom = pingdom
+        self.key = key
+        self.tags = tags
+        self.delete = delete
+        self.workers = workers or pingdom.workers
+
+    def _keyOf(self, item):
+        if callable(self.key):
+            return self.key(item)
+        keys = self.key if isinstance(self.key, tuple) else (self.key,)
+        if isinstance(item, dict):
+            values = tuple(item.get(k) for k in keys)
+        else:
+            values = tuple(_liveValue(item, k) for k in keys)
+        return values if len(values) > 1 else values[0]
+
+    def plan(self, desired):
+        """Returns the ReconcilePlan for an iterable of desired specs"""
+
+        parameters = {}
+        if self.tags:
+            parameters['tags'] = self.tags
+        # getChecks() is a coroutine on AsyncPingdom, use the blocking one
+        from pingdomlib.pingdom import Pingdom
+        live = collections.OrderedDict()
+        for check in Pingdom.getChecks(self.pingdom, **parameters):
+            live.setdefault(self._keyOf(check), []).append(check)
+
+        plan = ReconcilePlan()
+        matches = []
+        for spec in desired:
+            checks = live.pop(self._keyOf(spec), None)
+            if not checks:
+                plan.creates.append(dict(spec))
+                continue
+            # Duplicates of a managed check are extra checks
+            if self.delete:
+                plan.deletes.extend(checks[1:])
+            matches.append((checks[0], dict(spec)))
+
+        if self.delete:
+            for checks in live.values():
+                plan.deletes.extend(checks)
+
+        # The listing lacks most settings, fetch details where needed
+        hydrate = [check for check, spec in matches
+                   if set(spec) - listing_keys]
+        if hydrate:
+            self.pingdom.hydrate(hydrate, self.workers)
+
+        for check, spec in matches:
+            if spec.get('type', 'http') != check.type:
+                if self.delete:
+                    plan.deletes.append(check)
+                    plan.creates.append(spec)
+                    plan.replaces.append((check, spec))
+                else:
+                    plan.conflicts.append((check, spec))
+                continue
+
+            changes = {}
+            for key, value in spec.items():
+                if key == 'type':
+                    continue
+                if not _same(_liveValue(check, key), value):
+                    changes[key] = value
+            if changes:
+                plan.updates.append((check, changes))
+            else:
+                plan.unchanged += 1
+
+        return plan
+
+    def apply(self, plan):
+        """Runs the creates, updates and deletes of a plan, stores and
+            returns their results
+
+        A check whose type changed is only created again once the old one
+            was deleted. When that create fails the check is gone, a warning
+            is written to stderr.
+
+        Returned structure:
+        {
+            'created'  : <List> PingdomCheck or exception per spec created
+            'updated'  : <List> (<List> checks, <String> status message or
+                          exception) per request sent
+            'deleted'  : <String> status message or the exception raised,
+                          see Pingdom.deleteChecks()
+            'replaced' : <List> (<PingdomCheck> old check, new PingdomCheck
+                          or exception) per check whose type changed
+        }
+        """
+
+        from pingdomlib.pingdom import BulkCallError
+        results = {'created': [], 'updated': [], 'deleted': None,
+                   'replaced': []}
+
+        # Deletes first, replaced checks may share their name with new ones
+        deleted = set()
+        if plan.deletes:
+            checkids = [str(check.id) for check in plan.deletes]
+            try:
+                results['deleted'] = self.pingdom.deleteChecks(checkids)
+                deleted.update(checkids)
+            except BulkCallError as error:
+                results['deleted'] = error
+                for chunk, result in error.results:
+                    if not isinstance(result, Exception):
+                        deleted.update(chunk.split(','))
+            except Exception as error:
+                results['deleted'] = error
+
+        replaced = dict((id(spec), check) for check, spec in plan.replaces)
+        creates = []
+        for spec in plan.creates:
+            check = replaced.get(id(spec))
+            if check is None or str(check.id) in deleted:
+                creates.append(spec)
+                results['created'].append(None)
+            else:
+                results['created'].append(Exception(
+                    'Check %s was not replaced, deleting it failed' %
+                    check.id))
+        if creates:
+            created = iter(self.pingdom.newChecks(creates, details=False,
+                                                  workers=self.workers))
+            results['created'] = [next(created) if result is None else result
+                                  for result in results['created']]
+
+        for spec, result in zip(plan.creates, results['created']):
+            check = replaced.get(id(spec))
+            if check is None:
+                continue
+            results['replaced'].append((check, result))
+            if isinstance(result, Exception) and str(check.id) in deleted:
+                sys.stderr.write('%s (%s) was deleted but creating its '
+                                 'replacement failed: %s\n' % (
+                                     check.name, check.id, result))
+
+        groups = collections.OrderedDict()
+        calls = []
+        for check, changes in plan.updates:
+            if set(changes) <= bulk_keys:
+                group = tuple(sorted(changes.items()))
+                groups.setdefault(group, []).append(check)
+            else:
+                calls.append(([check], functools.partial(check.modify,
+                                                         **changes)))
+        for group, checks in groups.items():
+            calls.append((checks, functools.partial(
+                self.pingdom.modifyChecks,
+                checkids=[check.id for check in checks], **dict(group))))
+
+        for call, result in workerMap(lambda call: call[1](), calls,
+                                      self.workers, errors=True):
+            results['updated'].append((call[0], result))
+
+        plan.results = results
+        return results
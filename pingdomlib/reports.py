@@ -1,7 +1,9 @@
 import sys
 
+from pingdomlib.changes import ChangeTracking
 
-class PingdomEmailReport(object):
+
+class PingdomEmailReport(ChangeTracking):
     """Class represening a pingdom email report
 
     Attributes:
@@ -14,6 +16,10 @@ class PingdomEmailReport(object):
         * contactids -- List of identifiers for receiving contacts
     """
 
+    # Attributes whose changes are pushed to pingdom
+    _push_keys = frozenset(['id', 'name', 'checkid', 'frequency',
+                            'contactids', 'additionalemails'])
+
     def __init__(self, instantiator, reportdetails):
         self.pingdom = instantiator
 
@@ -22,12 +28,8 @@ class PingdomEmailReport(object):
 
     def __setattr__(self, key, value):
         # Autopush changes to attributes
-        if key in ['id', 'name', 'checkid', 'frequency', 'contactids',
-                   'additionalemails']:
-            if self.pingdom.pushChanges:
-                self.modify(**{key: value})
-            else:
-                object.__setattr__(self, key, value)
+        if key in self._push_keys:
+            self._pushChange(key, value)
         object.__setattr__(self, key, value)
 
     def modify(self, **kwargs):
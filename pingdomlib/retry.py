@@ -0,0 +1,132 @@
+import random
+import threading
+
+from requests.exceptions import ConnectionError, Timeout
+
+try:
+    from requests.exceptions import ConnectTimeout
+except ImportError:
+    # requests < 2.4 can't tell connect timeouts from read timeouts, where
+    # the request may have been processed. Never retry those unless the
+    # method is idempotent
+    ConnectTimeout = ()
+
+# Errors raised by requests for failures worth retrying
+retryable_errors = (ConnectionError, Timeout)
+
+
+class RetryPolicy(object):
+    """Decides if and when failed requests to pingdom are retried
+
+    Parameters:
+
+        * attempts -- Maximum number of attempts per request, including the
+            first one. Use 1 to disable retrying
+                Type: Integer
+                Default: 4
+
+        * backoff -- Delay before the first retry, in seconds
+                Type: Float
+                Default: 0.5
+
+        * multiplier -- Factor the delay grows by for every further retry
+                Type: Float
+                Default: 2
+
+        * maxbackoff -- Upper bound of the delay, in seconds
+                Type: Float
+                Default: 30
+
+        * jitter -- Fraction of the delay that is randomized, 1 picks
+            anywhere between no delay and the full delay
+                Type: Float [0 - 1]
+                Default: 1
+
+        * statuses -- HTTP statuses to retry
+                Type: Set of integers
+                Default: 429, 500, 502, 503, 504
+
+        * idempotent -- Methods that are safe to send twice. Other methods
+            (POST) are only retried when pingdom certainly didn't process
+            them: on 429 responses and connection timeouts
+                Type: Set of strings
+                Default: GET, PUT, DELETE
+
+    Attributes:
+
+        * stats -- Dictionary of counters for tuning the policy
+            {
+                'retries'   : <Integer> Retries sent
+                'recovered' : <Integer> Requests that succeeded after a retry
+                'exhausted' : <Integer> Requests that failed after all
+                               attempts were used
+                'reasons'   : <Dictionary> Retries per status code or
+                               exception name
+            }
+
+    One policy can be shared by several Pingdom instances, the counters
+    then cover all of them.
+    """
+
+    def __init__(self, attempts=4, backoff=0.5, multiplier=2, maxbackoff=30,
+                 jitter=1, statuses=(429, 500, 502, 503, 504),
+                 idempotent=('GET', 'PUT', 'DELETE')):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.multiplier = multiplier
+        self.maxbackoff = maxbackoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+        self.idempotent = frozenset(idempotent)
+        self.stats = {'retries': 0, 'recovered': 0, 'exhausted': 0,
+                      'reasons': {}}
+        self._lock = threading.Lock()
+
+    def retryStatus(self, method, attempt, status):
+        """Returns True if a request answered with status should be sent
+            again"""
+
+        if status not in self.statuses:
+            return False
+        if method.upper() not in self.idempotent and status != 429:
+            return False
+        return self._allow(attempt, status)
+
+    def retryError(self, method, attempt, error):
+        """Returns True if a request that raised error should be sent again"""
+
+        if not isinstance(error, retryable_errors):
+            return False
+        if (method.upper() not in self.idempotent and
+                not isinstance(error, ConnectTimeout)):
+            return False
+        return self._allow(attempt, type(error).__name__)
+
+    def delay(self, attempt, retryafter=None):
+        """Returns the seconds to wait before the next attempt, honoring a
+            Retry-After header if pingdom sent one"""
+
+        delay = min(self.backoff * self.multiplier ** (attempt - 1),
+                    self.maxbackoff)
+        delay -= delay * self.jitter * random.random()
+        try:
+            return max(delay, float(retryafter))
+        except (TypeError, ValueError):
+            return delay
+
+    def succeeded(self, attempt):
+        """Records a request that succeeded on the given attempt"""
+
+        if attempt > 1:
+            with self._lock:
+                self.stats['recovered'] += 1
+
+    def _allow(self, attempt, reason):
+        with self._lock:
+            if attempt >= self.attempts:
+                self.stats['exhausted'] += 1
+                return False
+            self.stats['retries'] += 1
+            reasons = self.stats['reasons']
+            reasons[reason] = reasons.get(reason, 0) + 1
+            return True
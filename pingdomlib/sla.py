@@ -0,0 +1,320 @@
+import collections
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class LatencyHistogram(object):
+    """Exact distribution of response times, counting how often each
+        millisecond value was seen
+
+    Memory is bounded by the number of distinct response times rather than
+    the number of results, so histories of any length can be added.
+    """
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.total = 0
+
+    def __len__(self):
+        return self.total
+
+    def add(self, responsetime, count=1):
+        self.counts[responsetime] += count
+        self.total += count
+
+    def merge(self, other):
+        """Adds the counts of another LatencyHistogram"""
+
+        self.counts.update(other.counts)
+        self.total += other.total
+
+    def mean(self):
+        if not self.total:
+            return None
+        return sum(value * count for value, count in
+                   self.counts.items()) / float(self.total)
+
+    def percentiles(self, percentiles):
+        """Returns a dictionary of nearest-rank percentiles, None when no
+            response time was added"""
+
+        result = dict((p, None) for p in percentiles)
+        if not self.total:
+            return result
+        ranks = sorted((max(int(-(-p * self.total // 100)), 1), p)
+                       for p in percentiles)
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            while ranks and ranks[0][0] <= seen:
+                result[ranks.pop(0)[1]] = value
+            if not ranks:
+                break
+        return result
+
+    def percentile(self, percentile):
+        return self.percentiles([percentile])[percentile]
+
+
+class SLAStats(object):
+    """Uptime and latency statistics for a group of results
+
+    Attributes:
+
+        * statuses -- Counter of results per status
+        * latency -- LatencyHistogram of response times of 'up' results
+        * first -- Time of the oldest result added
+        * last -- Time of the newest result added
+    """
+
+    def __init__(self):
+        self.statuses = collections.Counter()
+        self.latency = LatencyHistogram()
+        self.first = None
+        self.last = None
+
+    def add(self, time, status, responsetime):
+        self.statuses[status] += 1
+        if status == 'up':
+            self.latency.add(responsetime)
+        self._seen(time, time)
+
+    def _seen(self, first, last):
+        if self.first is None or first < self.first:
+            self.first = first
+        if self.last is None or last > self.last:
+            self.last = last
+
+    def merge(self, other):
+        """Adds the counts of another SLAStats"""
+
+        self.statuses.update(other.statuses)
+        self.latency.merge(other.latency)
+        if other.first is not None:
+            self._seen(other.first, other.last)
+
+    def uptime(self):
+        """Ratio of 'up' results among 'up' and 'down' ones, None without
+            any. Unconfirmed and unknown results are not counted"""
+
+        tested = self.statuses['up'] + self.statuses['down']
+        if not tested:
+            return None
+        return self.statuses['up'] / float(tested)
+
+    def errorBudget(self, target):
+        """Returns how much of the error budget of an uptime target is used
+
+        Returned structure:
+        {
+            'target'    : <Float> Uptime target, 0.999 for three nines
+            'allowed'   : <Float> Number of down results the target allows
+            'used'      : <Integer> Number of down results
+            'remaining' : <Float> Ratio of the budget left, negative once
+                           the target is missed
+        }
+        """
+
+        tested = self.statuses['up'] + self.statuses['down']
+        allowed = tested * (1 - target)
+        used = self.statuses['down']
+        if allowed:
+            remaining = 1 - used / allowed
+        else:
+            remaining = 0.0 if used else 1.0
+        return {'target': target, 'allowed': allowed, 'used': used,
+                'remaining': remaining}
+
+    def summary(self, percentiles=(50, 95, 99), target=None):
+        """Returns the statistics as a dictionary
+
+        Returned structure:
+        {
+            'results'    : <Integer> Number of results
+            'statuses'   : <Dictionary> Number of results per status
+            'uptime'     : <Float> See uptime()
+            'avgresponse': <Float> Mean response time of up results
+            'percentiles': <Dictionary> Response time per percentile
+            'errorbudget': <Dictionary> See errorBudget(), only with a target
+            'from'       : <Integer> Time of the oldest result
+            'to'         : <Integer> Time of the newest result
+        }
+        """
+
+        summary = {'results': sum(self.statuses.values()),
+                   'statuses': dict(self.statuses),
+                   'uptime': self.uptime(),
+                   'avgresponse': self.latency.mean(),
+                   'percentiles': self.latency.percentiles(percentiles),
+                   'from': self.first,
+                   'to': self.last}
+        if target is not None:
+            summary['errorbudget'] = self.errorBudget(target)
+        return summary
+
+
+class SLACalculator(object):
+    """Incremental uptime, error budget and response time percentiles over
+        raw results, overall and grouped per probe, country and time bucket
+
+    Results can be added in any order and in as many calls as needed, only
+    the counts are kept.
+
+    Parameters:
+
+        * bucket -- Length of the time buckets in seconds
+                Type: Integer
+                Default: 86400 (one day)
+
+        * countries -- Country per probe identifier, see probeCountries()
+                Type: Dictionary
+                Default: None (no grouping per country)
+
+        * target -- Uptime target of the error budget
+                Type: Float
+                Default: None (no error budget)
+
+    Attributes:
+
+        * overall -- SLAStats of all results
+        * probes -- Dictionary of SLAStats per probe identifier
+        * countries -- Dictionary of SLAStats per country
+        * buckets -- Dictionary of SLAStats per bucket start time
+    """
+
+    def __init__(self, bucket=86400, countries=None, target=None):
+        self.bucket = bucket
+        self.target = target
+        self.probecountries = countries
+        self.overall = SLAStats()
+        self.probes = collections.defaultdict(SLAStats)
+        self.countries = collections.defaultdict(SLAStats)
+        self.buckets = collections.defaultdict(SLAStats)
+
+    def add(self, result):
+        """Adds a result dictionary as described in PingdomCheck.results()"""
+
+        time = result['time']
+        status = result['status']
+        responsetime = result.get('responsetime') or 0
+
+        self.overall.add(time, status, responsetime)
+        self.probes[result['probeid']].add(time, status, responsetime)
+        self.buckets[time - time % self.bucket].add(time, status,
+                                                    responsetime)
+        if self.probecountries is not None:
+            country = self.probecountries.get(result['probeid'])
+            self.countries[country].add(time, status, responsetime)
+
+    def extend(self, results):
+        """Adds every result of an iterable of result dictionaries, such as
+            PingdomCheck.iterResults()"""
+
+        for result in results:
+            self.add(result)
+        return self
+
+    def addColumns(self, columns):
+        """Adds the results of a ResultColumns instance, see
+            pingdomlib.columnar. Counting is vectorized when numpy is
+            installed"""
+
+        if numpy is None:
+            for row in range(len(columns)):
+                self.add({'time': columns.time[row],
+                          'status': columns.status[row],
+                          'probeid': columns.probeid[row],
+                          'responsetime': columns.responsetime[row]})
+            return self
+        if not len(columns):
+            return self
+
+        arrays = columns.toNumpy()
+        times = arrays['time']
+        statuses = columns.status.values
+        probecodes = arrays['probeid']
+        buckets = times - times % self.bucket
+
+        self.overall.merge(self._countArrays(arrays, statuses, None))
+
+        for code, probeid in enumerate(columns.probeid.values):
+            stats = self._countArrays(arrays, statuses, probecodes == code)
+            self.probes[probeid].merge(stats)
+            if self.probecountries is not None:
+                country = self.probecountries.get(probeid)
+                self.countries[country].merge(stats)
+
+        for start in numpy.unique(buckets):
+            self.buckets[int(start)].merge(
+                self._countArrays(arrays, statuses, buckets == start))
+        return self
+
+    @staticmethod
+    def _countArrays(arrays, statuses, mask):
+        """Returns the SLAStats of the rows of column arrays selected by a
+            boolean mask, all rows when mask is None"""
+
+        times = arrays['time']
+        codes = arrays['status']
+        responsetimes = arrays['responsetime']
+        if mask is not None:
+            times = times[mask]
+            codes = codes[mask]
+            responsetimes = responsetimes[mask]
+
+        stats = SLAStats()
+        if not len(times):
+            return stats
+        for code, count in enumerate(numpy.bincount(codes,
+                                                    minlength=len(statuses))):
+            if count:
+                stats.statuses[statuses[code]] += int(count)
+        if 'up' in statuses:
+            values, counts = numpy.unique(
+                responsetimes[codes == statuses.index('up')],
+                return_counts=True)
+            for value, count in zip(values.tolist(), counts.tolist()):
+                stats.latency.add(value, count)
+        stats._seen(int(times.min()), int(times.max()))
+        return stats
+
+    def merge(self, other):
+        """Adds the counts of another SLACalculator with the same bucket
+            length, for instance one per shard or per worker"""
+
+        self.overall.merge(other.overall)
+        for mine, theirs in [(self.probes, other.probes),
+                             (self.countries, other.countries),
+                             (self.buckets, other.buckets)]:
+            for key, stats in theirs.items():
+                mine[key].merge(stats)
+
+    def report(self, percentiles=(50, 95, 99)):
+        """Returns the summaries of every group
+
+        Returned structure:
+        {
+            'overall'   : <Dictionary> See SLAStats.summary()
+            'probes'    : <Dictionary> Summary per probe identifier
+            'countries' : <Dictionary> Summary per country
+            'buckets'   : <Dictionary> Summary per bucket start time
+        }
+        """
+
+        report = {'overall': self.overall.summary(percentiles, self.target)}
+        for name in ['probes', 'countries', 'buckets']:
+            report[name] = dict(
+                (key, stats.summary(percentiles, self.target))
+                for key, stats in getattr(self, name).items())
+        return report
+
+
+def probeCountries(pingdom):
+    """Returns a dictionary of country per probe identifier, including
+        deleted probes found in older results"""
+
+    return dict((probe['id'], probe['country'])
+                for probe in pingdom.probes(includedeleted=True))
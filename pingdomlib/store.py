@@ -0,0 +1,362 @@
+import sqlite3
+import threading
+import time
+
+# Performance interval lengths in seconds per resolution
+resolution_seconds = {'hour': 3600, 'day': 86400, 'week': 604800}
+
+schema = [
+    'CREATE TABLE IF NOT EXISTS watermarks ('
+    ' checkid INTEGER PRIMARY KEY,'
+    ' time INTEGER NOT NULL)',
+    # Results at or just below a watermark, to skip them when the next sync
+    # asks for the same seconds again
+    'CREATE TABLE IF NOT EXISTS syncedkeys ('
+    ' checkid INTEGER NOT NULL,'
+    ' time INTEGER NOT NULL,'
+    ' probeid INTEGER NOT NULL,'
+    ' PRIMARY KEY (checkid, time, probeid))',
+    'CREATE TABLE IF NOT EXISTS results ('
+    ' checkid INTEGER NOT NULL,'
+    ' time INTEGER NOT NULL,'
+    ' probeid INTEGER NOT NULL,'
+    ' status TEXT NOT NULL,'
+    ' responsetime INTEGER,'
+    ' statusdesc TEXT,'
+    ' statusdesclong TEXT,'
+    ' analysisid INTEGER,'
+    ' PRIMARY KEY (checkid, time, probeid))',
+    'CREATE TABLE IF NOT EXISTS outages ('
+    ' checkid INTEGER NOT NULL,'
+    ' timefrom INTEGER NOT NULL,'
+    ' timeto INTEGER NOT NULL,'
+    ' status TEXT NOT NULL,'
+    ' PRIMARY KEY (checkid, timefrom))',
+    'CREATE TABLE IF NOT EXISTS performance ('
+    ' checkid INTEGER NOT NULL,'
+    ' resolution TEXT NOT NULL,'
+    ' starttime INTEGER NOT NULL,'
+    ' avgresponse INTEGER,'
+    ' uptime INTEGER,'
+    ' downtime INTEGER,'
+    ' unmonitored INTEGER,'
+    ' PRIMARY KEY (checkid, resolution, starttime))',
+    # Time ranges fetched completely, per check and kind of data
+    'CREATE TABLE IF NOT EXISTS coverage ('
+    ' checkid INTEGER NOT NULL,'
+    ' kind TEXT NOT NULL,'
+    ' timefrom INTEGER NOT NULL,'
+    ' timeto INTEGER NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS coverage_range '
+    ' ON coverage (checkid, kind, timefrom)',
+]
+
+result_columns = ['time', 'probeid', 'status', 'responsetime', 'statusdesc',
+                  'statusdesclong', 'analysisid']
+
+performance_columns = ['starttime', 'avgresponse', 'uptime', 'downtime',
+                       'unmonitored']
+
+
+class ResultStore(object):
+    """SQLite store of check history
+
+    Remembers how far the raw results of each check were synced, see
+    PingdomCheck.syncResults(), and keeps fetched results, outages and
+    performance intervals along with the time ranges they cover, see
+    PingdomCheck.storedResults(), storedOutages() and storedPerformance().
+
+    The store can be shared by threads and closed with close() or used as a
+    context manager.
+
+    Parameters:
+
+        * path -- Database file, created when missing
+                Type: String
+                Default: ':memory:' (kept for the life of the store only)
+
+        * settle -- Seconds before data is considered final. More recent
+            ranges are fetched again on every query
+                Type: Integer
+                Default: 300
+    """
+
+    def __init__(self, path=':memory:', settle=300):
+        self.path = path
+        self.settle = settle
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self.db:
+            for statement in schema:
+                self.db.execute(statement)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Closes the database"""
+
+        self.db.close()
+
+    def watermark(self, checkid):
+        """Returns the time of the newest result synced for a check, None
+            if it was never synced"""
+
+        with self._lock:
+            row = self.db.execute('SELECT time FROM watermarks '
+                                  'WHERE checkid = ?', (checkid,)).fetchone()
+        return row[0] if row else None
+
+    def syncedKeys(self, checkid, since):
+        """Returns a set of (time, probeid) tuples of the synced results of a
+            check from since on"""
+
+        with self._lock:
+            rows = self.db.execute('SELECT time, probeid FROM syncedkeys '
+                                   'WHERE checkid = ? AND time >= ?',
+                                   (checkid, since)).fetchall()
+        return set(rows)
+
+    def advance(self, checkid, watermark, keys, overlap=0):
+        """Moves the watermark of a check in a single transaction
+
+        Parameters:
+
+            * checkid -- Check identifier
+                    Type: Integer
+
+            * watermark -- Time of the newest result synced
+                    Type: Integer
+
+            * keys -- (time, probeid) tuples of the results synced within
+                overlap seconds of the watermark
+                    Type: Iterable
+
+            * overlap -- Seconds below the watermark asked for again by the
+                next sync
+                    Type: Integer
+                    Default: 0
+        """
+
+        with self._lock, self.db:
+            self.db.execute('INSERT OR REPLACE INTO watermarks '
+                            '(checkid, time) VALUES (?, ?)',
+                            (checkid, watermark))
+            self.db.executemany('INSERT OR IGNORE INTO syncedkeys '
+                                '(checkid, time, probeid) VALUES (?, ?, ?)',
+                                [(checkid, t, p) for t, p in keys])
+            self.db.execute('DELETE FROM syncedkeys '
+                            'WHERE checkid = ? AND time < ?',
+                            (checkid, watermark - overlap))
+
+    def cutoff(self, kind='results'):
+        """Returns the time up to which fetched data of a kind is final"""
+
+        cutoff = int(time.time()) - self.settle
+        if kind.startswith('performance/'):
+            # The interval in progress is not final
+            cutoff -= resolution_seconds[kind.split('/', 1)[1]]
+        return cutoff
+
+    def gaps(self, checkid, kind, time_from, time_to):
+        """Returns a list of (timefrom, timeto) ranges within time_from and
+            time_to, inclusive, that are not covered yet"""
+
+        with self._lock:
+            rows = self.db.execute('SELECT timefrom, timeto FROM coverage '
+                                   'WHERE checkid = ? AND kind = ? AND '
+                                   'timeto >= ? AND timefrom <= ? '
+                                   'ORDER BY timefrom',
+                                   (checkid, kind, time_from,
+                                    time_to)).fetchall()
+
+        gaps = []
+        start = time_from
+        for timefrom, timeto in rows:
+            if timefrom > start:
+                gaps.append((start, timefrom - 1))
+            start = max(start, timeto + 1)
+        if start <= time_to:
+            gaps.append((start, time_to))
+        return gaps
+
+    def cover(self, checkid, kind, time_from, time_to):
+        """Records a range as covered, merging it with overlapping and
+            adjacent ranges"""
+
+        if time_from > time_to:
+            return
+        with self._lock, self.db:
+            rows = self.db.execute('SELECT timefrom, timeto FROM coverage '
+                                   'WHERE checkid = ? AND kind = ? AND '
+                                   'timeto >= ? AND timefrom <= ?',
+                                   (checkid, kind, time_from - 1,
+                                    time_to + 1)).fetchall()
+            for timefrom, timeto in rows:
+                time_from = min(time_from, timefrom)
+                time_to = max(time_to, timeto)
+            self.db.execute('DELETE FROM coverage WHERE checkid = ? AND '
+                            'kind = ? AND timefrom >= ? AND timeto <= ?',
+                            (checkid, kind, time_from, time_to))
+            self.db.execute('INSERT INTO coverage '
+                            '(checkid, kind, timefrom, timeto) '
+                            'VALUES (?, ?, ?, ?)',
+                            (checkid, kind, time_from, time_to))
+
+    def saveResults(self, checkid, results):
+        """Stores result dictionaries as described in
+            PingdomCheck.results()"""
+
+        rows = [(checkid,) + tuple(result.get(key) for key in result_columns)
+                for result in results]
+        with self._lock, self.db:
+            self.db.executemany('INSERT OR REPLACE INTO results '
+                                '(checkid, %s) VALUES (?, %s)' % (
+                                    ', '.join(result_columns),
+                                    ', '.join(['?'] * len(result_columns))),
+                                rows)
+
+    def queryResults(self, checkid, time_from, time_to, status=None,
+                     probes=None):
+        """Returns the stored results of a check between time_from and
+            time_to, newest first, as described in PingdomCheck.results()
+
+        Parameters:
+
+            * status -- Comma separated list of statuses to return
+                    Type: String
+                    Default: All statuses
+
+            * probes -- Comma separated list of probe identifiers to return
+                    Type: String
+                    Default: All probes
+        """
+
+        query = ('SELECT %s FROM results WHERE checkid = ? AND '
+                 'time >= ? AND time <= ?' % ', '.join(result_columns))
+        arguments = [checkid, time_from, time_to]
+        for column, values in [('status', status), ('probeid', probes)]:
+            if values:
+                values = str(values).split(',')
+                query += ' AND %s IN (%s)' % (column,
+                                              ', '.join(['?'] * len(values)))
+                arguments.extend(values)
+        query += ' ORDER BY time DESC, probeid'
+
+        with self._lock:
+            rows = self.db.execute(query, arguments).fetchall()
+        return [dict(zip(result_columns, row)) for row in rows]
+
+    def saveOutages(self, checkid, states, time_from=None, time_to=None):
+        """Stores state intervals as described in PingdomCheck.outages()
+
+        Parameters:
+
+            * time_from -- Start of the range the states were fetched for.
+                Stored intervals within time_from and time_to are replaced
+                and the states are clipped to that range
+                    Type: Integer
+                    Default: Keep stored intervals
+
+            * time_to -- End of the range the states were fetched for
+                    Type: Integer
+                    Default: Keep stored intervals
+        """
+
+        if time_from is not None and time_to is not None:
+            states = [dict(state, timefrom=max(state['timefrom'], time_from),
+                           timeto=min(state['timeto'], time_to))
+                      for state in states]
+            states = [state for state in states
+                      if state['timefrom'] <= state['timeto']]
+
+        with self._lock, self.db:
+            if time_from is not None and time_to is not None:
+                # Split intervals crossing the range and drop the ones within
+                self.db.execute('INSERT OR REPLACE INTO outages '
+                                '(checkid, timefrom, timeto, status) '
+                                'SELECT checkid, ?, timeto, status '
+                                'FROM outages WHERE checkid = ? AND '
+                                'timefrom <= ? AND timeto > ?',
+                                (time_to + 1, checkid, time_to, time_to))
+                self.db.execute('UPDATE outages SET timeto = ? '
+                                'WHERE checkid = ? AND timefrom < ? AND '
+                                'timeto >= ?',
+                                (time_from - 1, checkid, time_from,
+                                 time_from))
+                self.db.execute('DELETE FROM outages WHERE checkid = ? AND '
+                                'timefrom >= ? AND timefrom <= ?',
+                                (checkid, time_from, time_to))
+            self.db.executemany('INSERT OR REPLACE INTO outages '
+                                '(checkid, timefrom, timeto, status) '
+                                'VALUES (?, ?, ?, ?)',
+                                [(checkid, state['timefrom'], state['timeto'],
+                                  state['status']) for state in states])
+
+    def queryOutages(self, checkid, time_from, time_to):
+        """Returns the stored state intervals of a check overlapping
+            time_from and time_to, oldest first, as described in
+            PingdomCheck.outages(). Touching intervals of the same status
+            fetched by separate calls are merged"""
+
+        with self._lock:
+            rows = self.db.execute('SELECT timefrom, timeto, status '
+                                   'FROM outages WHERE checkid = ? AND '
+                                   'timeto >= ? AND timefrom <= ? '
+                                   'ORDER BY timefrom',
+                                   (checkid, time_from, time_to)).fetchall()
+
+        states = []
+        for timefrom, timeto, status in rows:
+            if (states and states[-1]['status'] == status and
+                    timefrom <= states[-1]['timeto'] + 1):
+                states[-1]['timeto'] = max(timeto, states[-1]['timeto'])
+                continue
+            states.append({'status': status, 'timefrom': timefrom,
+                           'timeto': timeto})
+        return states
+
+    def savePerformance(self, checkid, resolution, intervals):
+        """Stores sub intervals as described in PingdomCheck.performance()"""
+
+        rows = [(checkid, resolution) + tuple(interval.get(key) for key in
+                                              performance_columns)
+                for interval in intervals]
+        with self._lock, self.db:
+            self.db.executemany('INSERT OR REPLACE INTO performance '
+                                '(checkid, resolution, %s) '
+                                'VALUES (?, ?, %s)' % (
+                                    ', '.join(performance_columns),
+                                    ', '.join(['?'] * len(
+                                        performance_columns))),
+                                rows)
+
+    def queryPerformance(self, checkid, resolution, time_from, time_to):
+        """Returns the stored sub intervals of a check starting between
+            time_from and time_to, oldest first"""
+
+        with self._lock:
+            rows = self.db.execute('SELECT %s FROM performance WHERE '
+                                   'checkid = ? AND resolution = ? AND '
+                                   'starttime >= ? AND starttime <= ? '
+                                   'ORDER BY starttime' %
+                                   ', '.join(performance_columns),
+                                   (checkid, resolution, time_from,
+                                    time_to)).fetchall()
+        return [dict(zip(performance_columns, row)) for row in rows]
+
+    def reset(self, checkid=None):
+        """Forgets the watermark and stored data of a check, or of every
+            check"""
+
+        with self._lock, self.db:
+            for table in ['watermarks', 'syncedkeys', 'results', 'outages',
+                          'performance', 'coverage']:
+                if checkid is None:
+                    self.db.execute('DELETE FROM %s' % table)
+                else:
+                    self.db.execute('DELETE FROM %s WHERE checkid = ?' %
+                                    table, (checkid,))
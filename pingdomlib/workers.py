@@ -0,0 +1,55 @@
+import collections
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def workerMap(function, items, workers, ordered=True, errors=False):
+    """Generator calling function for every item on a pool of threads
+
+    Yields (item, result) tuples, in the order of items when ordered is True
+    or as calls complete otherwise. At most twice as many calls as there are
+    workers are queued at once, so items can be a generator of any length.
+
+    Exceptions raised by function are re-raised while iterating, unless
+    errors is True in which case the exception is yielded as the result.
+    """
+
+    workers = max(workers or 1, 1)
+    items = iter(items)
+    pending = collections.deque()
+    executor = ThreadPoolExecutor(workers)
+
+    def submit():
+        for item in items:
+            pending.append((item, executor.submit(function, item)))
+            return True
+        return False
+
+    def result(item, future):
+        error = future.exception()
+        if error is None:
+            return item, future.result()
+        if errors:
+            return item, error
+        raise error
+
+    try:
+        while len(pending) < workers * 2 and submit():
+            pass
+
+        while pending:
+            if ordered:
+                item, future = pending.popleft()
+                wait([future])
+            else:
+                wait([f for _, f in pending], return_when=FIRST_COMPLETED)
+                for index, (item, future) in enumerate(pending):
+                    if future.done():
+                        del pending[index]
+                        break
+            submit()
+            yield result(item, future)
+    finally:
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
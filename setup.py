@@ -17,6 +17,7 @@ setup(
     description='A documented python library to consume the full pingdom API',
     long_description=open('README.txt').read(),
     install_requires=[
-        "requests >= 2.2.1"
+        "requests >= 2.2.1",
+        "futures >= 3.0.0; python_version < '3'"
     ],
 )
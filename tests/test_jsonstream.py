@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+from pingdomlib.jsonstream import JSONStream, iterItems
+
+document = json.dumps({
+    'summary': 12.5,
+    'counts': [-0.25, 1e-07, 3E+20, -12, 0],
+    'checks': [{'id': 1, 'name': u'café ☃', 'time': 1.5e3,
+                'up': True, 'tags': [], 'error': None},
+               {'id': 22, 'responsetime': -1.125E-3, 'nested': {'a': [1]}},
+               12.75, 'text', False, 3],
+    'after': 100}, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def splits(data):
+    """Yields the document cut in two at every byte, and in single bytes"""
+
+    for index in range(len(data) + 1):
+        yield [data[:index], data[index:]]
+    yield [data[index:index + 1] for index in range(len(data))]
+
+
+class IterItemsTest(unittest.TestCase):
+
+    def test_every_split(self):
+        expected = json.loads(document.decode('utf-8'))
+        for chunks in splits(document):
+            self.assertEqual(list(iterItems(chunks, ('checks',))),
+                             expected['checks'])
+            self.assertEqual(list(iterItems(chunks, ('counts',))),
+                             expected['counts'])
+
+    def test_nested_path(self):
+        data = b'{"actions": {"alerts": [{"time": 1}, {"time": 2}]}}'
+        for chunks in splits(data):
+            self.assertEqual(list(iterItems(chunks, ('actions', 'alerts'))),
+                             [{'time': 1}, {'time': 2}])
+
+    def test_missing_path(self):
+        for data in [b'{"checks": 1.5}', b'{"other": [1, 2]}', b'{}', b'[]']:
+            for chunks in splits(data):
+                self.assertEqual(list(iterItems(chunks, ('checks',))), [])
+
+    def test_number_at_end(self):
+        for chunks in splits(b'-12.5e+3'):
+            self.assertEqual(JSONStream(chunks).value(), -12.5e+3)
+
+    def test_truncated(self):
+        self.assertRaises(ValueError, list,
+                          iterItems([b'{"checks": [1, 2'], ('checks',)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import threading
+import time
+import unittest
+
+from pingdomlib.ratelimit import RateLimit, RateLimiter, reset_margin
+
+
+def exhausted(reset):
+    header = 'Remaining: 0 Time until reset: %d' % reset
+    return {'Req-Limit-Short': header, 'Req-Limit-Long': header}
+
+
+class RateLimitTest(unittest.TestCase):
+
+    def test_reset_margin(self):
+        limit = RateLimit.parse('Remaining: 5 Time until reset: 10', 1000.0)
+        self.assertEqual(limit.remaining, 5)
+        self.assertEqual(limit.resettime, 1010.0 + reset_margin)
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def acquireAll(self, limiter, threads):
+        waits = []
+        lock = threading.Lock()
+
+        def acquire():
+            wait = limiter.acquire()
+            with lock:
+                waits.append(wait)
+
+        workers = [threading.Thread(target=acquire) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return waits
+
+    def test_empty_bucket_blocks_every_thread(self):
+        limiter = RateLimiter()
+        limiter.update(exhausted(0))
+        waits = self.acquireAll(limiter, 5)
+        self.assertEqual(len(waits), 5)
+        # Pingdom rounds the reset down, nobody may go before the margin
+        for wait in waits:
+            self.assertGreater(wait, reset_margin - 0.1)
+
+    def test_bucket_spent_by_threads(self):
+        limiter = RateLimiter()
+        limiter.update({'Req-Limit-Short': 'Remaining: 3 Time until reset: 0'})
+        waits = sorted(self.acquireAll(limiter, 6))
+        self.assertEqual(waits[:3], [0, 0, 0])
+        for wait in waits[3:]:
+            self.assertGreater(wait, reset_margin - 0.1)
+
+    def test_reset_bucket_is_dropped(self):
+        limiter = RateLimiter()
+        limiter.update(exhausted(0))
+        for limit in limiter.limits.values():
+            limit.resettime = time.time() - 1
+        self.assertEqual(limiter.acquire(), 0)
+        self.assertEqual(limiter.budget(), {'short': None, 'long': None})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,644 @@
+"""Regression tests of the client against the local api simulator of
+benchmarks/simulator.py"""
+import os
+import sys
+import time
+import unittest
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'benchmarks'))
+
+import pingdomlib
+import pingdomlib.pingdom
+from pingdomlib.cache import ResponseCache
+from pingdomlib.check import PingdomCheck
+from pingdomlib.instrumentation import RequestHook
+from pingdomlib.reconcile import CheckReconciler
+from pingdomlib.retry import RetryPolicy
+from pingdomlib.store import ResultStore
+from simulator import PingdomSimulator
+
+
+class SimulatedTest(unittest.TestCase):
+
+    simulator_options = {}
+
+    def setUp(self):
+        self.simulator = PingdomSimulator(**self.simulator_options)
+        self.simulator.start()
+        self.api = self.connect()
+
+    def tearDown(self):
+        self.api.close()
+        self.simulator.stop()
+
+    def connect(self, **kwargs):
+        kwargs.setdefault('retrypolicy', RetryPolicy(attempts=1))
+        return pingdomlib.Pingdom('user', 'pass', 'key',
+                                  server=self.simulator.url, **kwargs)
+
+
+class RateLimitTest(SimulatedTest):
+
+    simulator_options = {'checks': 40, 'enforce': True,
+                         'ratelimits': ((20, 2), (100000, 86400))}
+
+    def test_parallel_requests_stay_within_limit(self):
+        checks = self.api.getChecks()
+        self.api.hydrate(checks, workers=8)
+        self.assertEqual(self.simulator.stats['ratelimited'], 0)
+        self.assertTrue(all(check.__dict__.get('contactids') == [1]
+                            for check in checks))
+
+
+class RetryTest(SimulatedTest):
+
+    simulator_options = {'checks': 1, 'enforce': True,
+                         'ratelimits': ((1, 1), (100000, 86400))}
+
+    def test_retry_after_is_honored(self):
+        delays = []
+
+        class Recorder(RequestHook):
+            def retry(self, event):
+                delays.append(event['delay'])
+
+        # Without the rate limiter the second call is refused
+        api = self.connect(ratelimit=False, hooks=[Recorder()],
+                           retrypolicy=RetryPolicy(attempts=3, backoff=0,
+                                                   jitter=0))
+        api.getChecks()
+        start = time.time()
+        self.assertEqual(len(api.getChecks()), 1)
+        self.assertTrue(time.time() - start >= 1)
+        self.assertEqual(delays, [1.0])
+        self.assertEqual(self.simulator.stats['ratelimited'], 1)
+        self.assertEqual(api.retrypolicy.stats['recovered'], 1)
+
+class FlushTest(SimulatedTest):
+
+    simulator_options = {'checks': 400, 'seed': 1}
+
+    def setUp(self):
+        SimulatedTest.setUp(self)
+        self.api.pushChanges = False
+        self.checks = self.api.getChecks()
+        for check in self.checks:
+            check.paused = True
+
+    def paused(self):
+        return set(checkid for checkid, check in self.simulator.checks.items()
+                   if check['status'] == 'paused')
+
+    def pending(self):
+        return set(check.id for check in self.checks
+                   if check.pendingChanges())
+
+    def test_failed_chunks_keep_changes(self):
+        self.simulator.errorrate = 1.0
+        results = self.api.flush()
+        # 400 ids of 7 digits take 3 bulk calls
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(isinstance(result, Exception)
+                            for items, result in results))
+        self.assertEqual(len(self.pending()), 400)
+        self.assertEqual(self.paused(), set())
+
+    def test_partial_failure(self):
+        self.simulator.errorrate = 0.5
+        self.api.flush()
+        self.assertEqual(self.pending() | self.paused(),
+                         set(self.simulator.checks))
+        self.assertEqual(self.pending() & self.paused(), set())
+
+        self.simulator.errorrate = 0.0
+        self.api.flush()
+        self.assertEqual(self.pending(), set())
+        self.assertEqual(len(self.paused()), 400)
+
+
+class BatchTest(SimulatedTest):
+
+    simulator_options = {'checks': 1}
+
+    def setUp(self):
+        SimulatedTest.setUp(self)
+        self.check = self.api.getCheck(next(iter(self.simulator.checks)))
+
+    def test_exception_restores_values(self):
+        def change():
+            with self.check.batch():
+                self.check.resolution = 5
+                self.check.paused = True
+                raise ValueError('abort')
+
+        self.assertRaises(ValueError, change)
+        self.assertEqual(self.check.resolution, 1)
+        self.assertEqual(self.check.paused, False)
+        self.assertFalse(self.check.pendingChanges())
+        self.assertEqual(self.simulator.stats['PUT checks'], 0)
+
+    def test_single_modify(self):
+        with self.check.batch():
+            self.check.resolution = 5
+            self.check.paused = True
+        self.assertEqual(self.simulator.stats['PUT checks'], 1)
+        self.assertEqual(self.simulator.checks[self.check.id]['status'],
+                         'paused')
+        self.assertEqual(self.simulator.checks[self.check.id]['resolution'],
+                         5)
+
+    def test_failed_push_keeps_changes(self):
+        self.simulator.errorrate = 1.0
+
+        def change():
+            with self.check.batch():
+                self.check.resolution = 5
+
+        self.assertRaises(Exception, change)
+        self.assertEqual(self.check.resolution, 5)
+        self.assertEqual(self.check.pendingChanges(), {'resolution': 5})
+
+        self.simulator.errorrate = 0.0
+        self.api.flush()
+        self.assertFalse(self.check.pendingChanges())
+        self.assertEqual(self.simulator.checks[self.check.id]['resolution'],
+                         5)
+
+class BulkCallTest(SimulatedTest):
+
+    simulator_options = {'checks': 400}
+
+    def chunks(self, ids):
+        sent = []
+        self.api._bulkCall(lambda chunk: sent.append(chunk) or 'ok', ids)
+        return sent
+
+    def test_strings_and_lists_give_same_ids(self):
+        expected = ['12,34']
+        self.assertEqual(self.chunks('12,34'), expected)
+        self.assertEqual(self.chunks(u'12, 34'), expected)
+        self.assertEqual(self.chunks(b'12,34'), expected)
+        self.assertEqual(self.chunks([12, 34]), expected)
+        self.assertEqual(self.chunks(iter(['12', '34'])), expected)
+
+        ids = list(self.simulator.checks)
+        self.assertEqual(self.chunks(ids),
+                         self.chunks(','.join(str(i) for i in ids)))
+        self.assertEqual(len(self.chunks(ids)), 3)
+        self.assertEqual(self.chunks([]), [])
+
+    def test_same_result_for_any_size(self):
+        ids = list(self.simulator.checks)
+        for chunk in [ids[:10], ids[10:]]:
+            self.assertTrue(isinstance(
+                self.api.modifyChecks(checkids=chunk, paused=True),
+                pingdomlib.pingdom.string_types))
+        self.assertEqual(len(self.paused()), 400)
+
+        self.simulator.errorrate = 1.0
+        for chunk, count in [(ids[:10], 1), (ids, 3)]:
+            try:
+                self.api.deleteChecks(chunk)
+            except pingdomlib.pingdom.BulkCallError as error:
+                self.assertEqual(len(error.results), count)
+                self.assertEqual(len(error.errors), count)
+            else:
+                self.fail('BulkCallError not raised')
+        self.assertEqual(len(self.simulator.checks), 400)
+
+    def paused(self):
+        return [check for check in self.simulator.checks.values()
+                if check['status'] == 'paused']
+
+
+def settings(checks):
+    return [dict((key, value) for key, value in check.__dict__.items()
+                 if key != 'pingdom') for check in checks]
+
+
+def alertMessages(alerts):
+    # Alert times follow the clock of the simulator
+    return [(alert['checkid'], alert['messagefull']) for alert in alerts]
+
+
+class StreamTest(SimulatedTest):
+
+    simulator_options = {'checks': 50}
+
+    def setUp(self):
+        SimulatedTest.setUp(self)
+        self.chunk_size = pingdomlib.pingdom.stream_chunk_size
+
+    def tearDown(self):
+        pingdomlib.pingdom.stream_chunk_size = self.chunk_size
+        SimulatedTest.tearDown(self)
+
+    def test_small_chunks(self):
+        whole = self.connect(stream=False)
+        checks = settings(whole.getChecks())
+        alerts = alertMessages(whole.iterAlerts(maxalerts=400))
+
+        for compression in [True, False]:
+            streamed = self.connect(stream=True, compression=compression)
+            for size in [1, 7, 4096]:
+                pingdomlib.pingdom.stream_chunk_size = size
+                self.assertEqual(settings(streamed.getChecks()), checks)
+                self.assertEqual(alertMessages(
+                    streamed.iterAlerts(maxalerts=400)), alerts)
+
+    def test_cache_only_reads_cached_urls_in_full(self):
+        api = self.connect(stream=True, cache=ResponseCache())
+        sent = []
+        send = api._send
+
+        def record(method, url, parameters, stream=False, event=None):
+            sent.append((url, stream))
+            return send(method, url, parameters, stream, event)
+
+        api._send = record
+        checks = api.getChecks()
+        self.assertEqual(settings(checks),
+                         settings(self.connect(stream=False).getChecks()))
+        url = 'checks/%s' % checks[0].id
+        api.request('GET', url, stream=True).json()
+        self.assertEqual(sent, [('checks', True), (url, False)])
+
+
+class CacheTest(SimulatedTest):
+
+    simulator_options = {'checks': 2}
+
+    def test_hits_and_invalidation(self):
+        cache = ResponseCache()
+        api = self.connect(cache=cache)
+        checkid = next(iter(self.simulator.checks))
+        api.getCheck(checkid)
+        sent = self.simulator.stats['GET checks']
+        check = api.getCheck(checkid)
+        self.assertEqual(self.simulator.stats['GET checks'], sent)
+        self.assertEqual(cache.stats['hits'], 1)
+        self.assertEqual(check.status, 'up')
+
+        # Writes to an endpoint drop its cached responses
+        check.modify(paused=True)
+        self.assertEqual(cache.stats['invalidations'], 1)
+        self.assertEqual(api.getCheck(checkid).status, 'paused')
+        self.assertEqual(self.simulator.stats['GET checks'], sent + 1)
+
+class IterResultsTest(SimulatedTest):
+
+    simulator_options = {'checks': 1}
+
+    def setUp(self):
+        SimulatedTest.setUp(self)
+        self.check = PingdomCheck(self.api,
+                                  {'id': next(iter(self.simulator.checks))})
+
+    def test_paging_past_max_offset(self):
+        # One result a minute, 31 days are more than 43200 results
+        time_to = int(time.time())
+        time_from = time_to - 31 * 86400 + 0.5
+        expected = (time_to // 60) - (int(time_from) + 59) // 60 + 1
+
+        for shards in [1, 4]:
+            times = [result['time'] for result in
+                     self.check.iterResults(time_from, time_to,
+                                            shards=shards)]
+            self.assertEqual(len(times), expected)
+            self.assertEqual(len(set(times)), expected)
+            if shards == 1:
+                self.assertEqual(times, sorted(times, reverse=True))
+        self.assertEqual(self.simulator.stats.get('errors', 0), 0)
+
+
+class StoreTest(SimulatedTest):
+
+    simulator_options = {'checks': 1}
+
+    def setUp(self):
+        SimulatedTest.setUp(self)
+        self.check = PingdomCheck(self.api,
+                                  {'id': next(iter(self.simulator.checks))})
+        self.store = ResultStore()
+
+    def requests(self):
+        return self.simulator.stats['GET results']
+
+    def test_only_gaps_are_fetched(self):
+        time_to = int(time.time()) - 86400
+        time_from = time_to - 3600
+
+        results = self.check.storedResults(self.store, time_from, time_to)
+        self.assertEqual(len(results), 60)
+        self.assertEqual(self.store.gaps(self.check.id, 'results', time_from,
+                                         time_to), [])
+        sent = self.requests()
+
+        self.assertEqual(self.check.storedResults(self.store, time_from,
+                                                  time_to), results)
+        self.assertEqual(self.requests(), sent)
+
+        # Only the hour before is missing
+        self.assertEqual(self.store.gaps(self.check.id, 'results',
+                                         time_from - 3600, time_to),
+                         [(time_from - 3600, time_from - 1)])
+        self.assertEqual(len(self.check.storedResults(
+            self.store, time_from - 3600, time_to)), 120)
+        self.assertEqual(self.requests(), sent + 1)
+
+    def test_refetched_outages_replace_stored_ones(self):
+        def states(*rows):
+            return [{'timefrom': timefrom, 'timeto': timeto, 'status': status}
+                    for timefrom, timeto, status in rows]
+
+        checkid = self.check.id
+        self.store.saveOutages(checkid, states((0, 99, 'up'),
+                                               (100, 199, 'down'),
+                                               (200, 299, 'up')))
+        # The refetched range ends within a stored interval
+        self.store.saveOutages(checkid, states((0, 400, 'up')), 150, 249)
+        self.assertEqual(self.store.queryOutages(checkid, 0, 299),
+                         states((0, 99, 'up'), (100, 149, 'down'),
+                                (150, 299, 'up')))
+        # A stored interval spans the whole refetched range
+        self.store.saveOutages(checkid, states((0, 400, 'down')), 20, 29)
+        self.assertEqual(self.store.queryOutages(checkid, 0, 99),
+                         states((0, 19, 'up'), (20, 29, 'down'),
+                                (30, 99, 'up')))
+
+    def test_second_sync_fetches_new_results(self):
+        sent = []
+        send = self.api._send
+
+        def record(method, url, parameters, stream=False, event=None):
+            sent.append(dict(parameters))
+            return send(method, url, parameters, stream, event)
+
+        self.api._send = record
+        time_from = int(time.time()) - 3600
+        first = list(self.check.syncResults(self.store, time_from,
+                                            overlap=120))
+        self.assertTrue(len(first) >= 60)
+        self.assertEqual(int(sent[0]['from']), time_from)
+        newest = self.store.watermark(self.check.id)
+        self.assertEqual(newest, first[0]['time'])
+
+        del sent[:]
+        second = list(self.check.syncResults(self.store, time_from,
+                                             overlap=120))
+        self.assertEqual(int(sent[0]['from']), newest - 120)
+        # Only a result recorded since the first sync is new
+        self.assertTrue(len(second) <= 1)
+        self.assertTrue(all(result['time'] > newest for result in second))
+
+    def test_async_checks(self):
+        from pingdomlib.asyncpingdom import AsyncPingdom, AsyncPingdomCheck
+        api = AsyncPingdom('user', 'pass', 'key', server=self.simulator.url)
+        try:
+            check = AsyncPingdomCheck(api, {'id': self.check.id})
+            time_to = int(time.time()) - 86400
+            time_from = time_to - 7 * 86400
+            self.assertEqual(
+                check.storedOutages(ResultStore(), time_from, time_to),
+                self.check.storedOutages(self.store, time_from, time_to))
+            self.assertEqual(
+                check.storedPerformance(ResultStore(), time_from, time_to),
+                self.check.storedPerformance(self.store, time_from, time_to))
+        finally:
+            api.close()
+
+    def test_recent_results_are_fetched_again(self):
+        time_to = int(time.time())
+        self.check.storedResults(self.store, time_to - 3600, time_to)
+        sent = self.requests()
+        self.check.storedResults(self.store, time_to - 3600, time_to)
+        self.assertEqual(self.requests(), sent + 1)
+
+
+class SimulatorTest(SimulatedTest):
+
+    simulator_options = {'checks': 3}
+
+    def test_reconcile_converges(self):
+        desired = [{'name': 'check-0', 'host': 'new.example.com',
+                    'resolution': 5},
+                   {'name': 'created', 'host': 'created.example.com',
+                    'paused': True, 'url': '/health', 'port': 8080}]
+        plan = self.api.reconcile(desired, delete=True)
+        self.assertEqual(len(plan), 4)
+        self.assertEqual(len(self.api.reconcile(desired, delete=True,
+                                                dryrun=True)), 0)
+
+    def test_invalid_parameter(self):
+        checkid = next(iter(self.simulator.checks))
+        status, body, headers = self.simulator.handle(
+            'GET', 'results/%d' % checkid, {'from': '1.5'})
+        self.assertEqual(status, 400)
+
+
+def summaries(collected):
+    return sorted((check.id, name, summary)
+                  for check, name, summary in collected)
+
+
+class SummariesTest(SimulatedTest):
+
+    simulator_options = {'checks': 5}
+
+    def setUp(self):
+        SimulatedTest.setUp(self)
+        self.time_to = int(time.time()) - 86400
+        self.time_from = self.time_to - 7 * 86400
+
+    def collect(self, api, **kwargs):
+        return summaries(api.collectSummaries(time_from=self.time_from,
+                                              time_to=self.time_to,
+                                              **kwargs))
+
+    def test_every_check_and_summary(self):
+        collected = self.collect(self.api)
+        self.assertEqual([(checkid, name) for checkid, name, summary in
+                          collected],
+                         sorted((checkid, name)
+                                for checkid in self.simulator.checks
+                                for name in ['averages', 'outages',
+                                             'performance']))
+        self.assertFalse(any(isinstance(summary, Exception)
+                             for checkid, name, summary in collected))
+
+        from pingdomlib.asyncpingdom import AsyncPingdom
+        api = AsyncPingdom('user', 'pass', 'key', server=self.simulator.url)
+        try:
+            self.assertEqual(self.collect(api), collected)
+        finally:
+            api.close()
+
+    def test_failures_are_yielded(self):
+        self.simulator.errorrate = 1.0
+        checks = [PingdomCheck(self.api, {'id': checkid})
+                  for checkid in self.simulator.checks]
+        collected = self.collect(self.api, checks=checks,
+                                 summaries=('outages',))
+        self.assertEqual(len(collected), 5)
+        self.assertTrue(all(isinstance(summary, Exception)
+                            for checkid, name, summary in collected))
+
+class AsyncTest(SimulatedTest):
+
+    simulator_options = {'checks': 3}
+
+    def setUp(self):
+        SimulatedTest.setUp(self)
+        import asyncio
+        from pingdomlib.asyncpingdom import AsyncPingdom
+        self.asyncio = asyncio
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.async_api = AsyncPingdom('user', 'pass', 'key',
+                                      server=self.simulator.url)
+
+    def tearDown(self):
+        self.async_api.close()
+        self.loop.close()
+        self.asyncio.set_event_loop(None)
+        SimulatedTest.tearDown(self)
+
+    def wait(self, *coroutines):
+        if len(coroutines) == 1:
+            return self.loop.run_until_complete(coroutines[0])
+        return self.loop.run_until_complete(self.asyncio.gather(*coroutines))
+
+    def test_same_data_as_sync_client(self):
+        checks = self.wait(self.async_api.getChecks())
+        self.assertEqual(settings(checks), settings(self.api.getChecks()))
+        checkid = checks[0].id
+        check = self.wait(self.async_api.getCheck(checkid))
+        self.assertEqual(settings([check]),
+                         settings([self.api.getCheck(checkid)]))
+        self.assertEqual(
+            alertMessages(self.wait(self.async_api.alerts(limit=50))),
+            alertMessages(self.api.alerts(limit=50)))
+
+        time_to = int(time.time()) - 86400
+        time_from = time_to - 86400
+        window = {'time_from': time_from, 'time_to': time_to}
+        for check in checks:
+            sync = PingdomCheck(self.api, {'id': check.id})
+            self.assertEqual(
+                self.wait(check.averages(**window), check.outages(**window),
+                          check.performance(**window),
+                          check.hoursofday(**window),
+                          check.results(**window),
+                          check.probes(time_from, time_to)),
+                [sync.averages(**window), sync.outages(**window),
+                 sync.performance(**window), sync.hoursofday(**window),
+                 sync.results(**window), sync.probes(time_from, time_to)])
+
+class ReconcileTest(SimulatedTest):
+
+    simulator_options = {'checks': 3}
+
+    def addCheck(self, name, **settings):
+        settings.update(name=name, host='%s.example.com' % name)
+        return self.simulator._addCheck(settings, int(time.time()))['id']
+
+    def names(self):
+        return sorted(check['name']
+                      for check in self.simulator.checks.values())
+
+    def test_no_deletes_without_delete(self):
+        self.addCheck('check-0')
+        desired = [{'name': 'check-0', 'host': 'host0.example.com'},
+                   {'name': 'check-1', 'host': 'host1.example.com',
+                    'type': 'tcp', 'port': 22}]
+        before = set(self.simulator.checks)
+        plan = self.api.reconcile(desired)
+        self.assertEqual(plan.deletes, [])
+        self.assertEqual([spec['name'] for check, spec in plan.conflicts],
+                         ['check-1'])
+        self.assertEqual(plan.results['deleted'], None)
+        self.assertEqual(set(self.simulator.checks), before)
+
+    def test_tags_leave_unmanaged_checks_alone(self):
+        managed = self.addCheck('managed', tags='managed')
+        desired = [{'name': 'check-0', 'host': 'new.example.com'}]
+        plan = self.api.reconcile(desired, tags='managed', delete=True)
+        # check-0 is unmanaged, a managed one is created next to it
+        self.assertEqual([check.id for check in plan.deletes], [managed])
+        self.assertEqual([spec['name'] for spec in plan.creates], ['check-0'])
+        self.assertEqual(self.names(), ['check-0', 'check-0', 'check-1',
+                                        'check-2'])
+        self.assertEqual(sorted(check['hostname'] for check in
+                                self.simulator.checks.values()
+                                if check['name'] == 'check-0'),
+                         ['host0.example.com', 'new.example.com'])
+
+    def test_duplicates(self):
+        duplicate = self.addCheck('check-0')
+        desired = [{'name': 'check-%d' % i, 'host': 'host%d.example.com' % i}
+                   for i in range(3)]
+        self.assertEqual(len(self.api.reconcile(desired, dryrun=True)), 0)
+
+        plan = self.api.reconcile(desired, delete=True)
+        self.assertEqual([check.id for check in plan.deletes], [duplicate])
+        self.assertEqual(self.names(), ['check-0', 'check-1', 'check-2'])
+        self.assertEqual(len(self.api.reconcile(desired, delete=True,
+                                                dryrun=True)), 0)
+
+    def test_type_change_replaces_check(self):
+        checkid = next(iter(self.simulator.checks))
+        desired = [{'name': 'check-0', 'host': 'example.com', 'type': 'tcp',
+                    'port': 22}]
+        plan = self.api.reconcile(desired, delete=True)
+        (old, new), = plan.results['replaced']
+        self.assertEqual(old.id, checkid)
+        self.assertEqual(list(self.simulator.checks), [new.id])
+        self.assertEqual(self.simulator.checks[new.id]['type'], 'tcp')
+
+    def test_failed_create_after_replace(self):
+        checkid = next(iter(self.simulator.checks))
+        desired = [{'name': 'check-0', 'host': 'example.com', 'type': 'tcp',
+                    'port': 'ssh'}]
+        reconciler = CheckReconciler(self.api, key='name', delete=True)
+        plan = reconciler.plan(desired)
+        plan.deletes = [old for old, spec in plan.replaces]
+
+        stderr = sys.stderr
+        sys.stderr = captured = StringIO()
+        try:
+            results = reconciler.apply(plan)
+        finally:
+            sys.stderr = stderr
+        (old, error), = results['replaced']
+        self.assertEqual(old.id, checkid)
+        self.assertTrue(isinstance(error, Exception))
+        self.assertFalse(checkid in self.simulator.checks)
+        self.assertTrue('check-0 (%s) was deleted' % checkid in
+                        captured.getvalue())
+
+    def test_failed_delete_keeps_replaced_check(self):
+        checkid = next(iter(self.simulator.checks))
+        desired = [{'name': 'check-0', 'host': 'example.com', 'type': 'tcp',
+                    'port': 22}]
+        reconciler = CheckReconciler(self.api, key='name', delete=True)
+        plan = reconciler.plan(desired)
+
+        def fail(checkids):
+            raise Exception('Deleting failed')
+
+        self.api.deleteChecks = fail
+        results = reconciler.apply(plan)
+        (old, error), = results['replaced']
+        self.assertTrue(isinstance(error, Exception))
+        self.assertEqual(self.simulator.stats['POST checks'], 0)
+        self.assertEqual(self.simulator.checks[checkid]['type'], 'http')
+
+
+if __name__ == '__main__':
+    unittest.main()
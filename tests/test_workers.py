@@ -0,0 +1,29 @@
+import unittest
+
+from pingdomlib.workers import workerMap
+
+
+class WorkerMapTest(unittest.TestCase):
+
+    def test_any_number_of_workers(self):
+        expected = [(item, item * 2) for item in range(10)]
+        for workers in [None, 0, -1, 1, 4]:
+            self.assertEqual(list(workerMap(lambda item: item * 2, range(10),
+                                            workers)), expected)
+            self.assertEqual(sorted(workerMap(lambda item: item * 2,
+                                              range(10), workers,
+                                              ordered=False)), expected)
+
+    def test_errors(self):
+        def fail(item):
+            raise ValueError(item)
+
+        results = list(workerMap(fail, range(3), 2, errors=True))
+        self.assertEqual([item for item, error in results], [0, 1, 2])
+        self.assertTrue(all(isinstance(error, ValueError)
+                            for item, error in results))
+        self.assertRaises(ValueError, list, workerMap(fail, range(3), 2))
+
+
+if __name__ == '__main__':
+    unittest.main()